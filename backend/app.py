@@ -1,47 +1,332 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, send_file
 from flask_cors import CORS
+from flask_compress import Compress
+from rdkit import Chem
 import sys
 import os
-import tempfile
+import re
 import json
+import base64
+import copy
+from io import BytesIO
+import orjson
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 
 # Add the current directory to path to import our modules
 sys.path.append(os.path.dirname(__file__))
 
 # Import our existing functional catalog
-from FunctionalCatalog import FunctionalGroupAnalyzer, find_matches, Molecule
+from FunctionalCatalog import (FunctionalGroupAnalyzer, find_matches, Molecule,
+                               visualize_matches, visualize_matches_batch)
+from render_workers import (THUMBNAIL_SIZE, THUMBNAIL_FORMATS, encode_thumbnail,
+                            worker_init, render_thumbnail_batch)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Compress JSON responses; base64 image payloads shrink well
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 2048
+Compress(app)
+
 # Initialize the analyzer globally
 analyzer = None
 
+# Limits on SMILES/SMARTS input checked before anything reaches RDKit; very long or
+# highly repetitive strings make parsing and perception disproportionately slow
+MAX_SMILES_LENGTH = 500
+MAX_REPEATED_CHARS = 200
+REPEATED_CHARS_RE = re.compile(r'(.)\1{%d,}' % MAX_REPEATED_CHARS)
+
+# Number of distinct match results (and inline image sets) kept in memory for
+# repeated requests
+ANALYSIS_CACHE_SIZE = 512
+
+ANALYZER_JSON_PATH = os.path.join(os.path.dirname(__file__), 'functional_group_with_chebi_updated.json')
+
+# Pixel size of the overview image (thumbnail size lives in render_workers)
+MAIN_IMAGE_SIZE = (400, 400)
+
+# Threads rendering images requested after /api/analyze has returned
+MAX_RENDER_WORKERS = 8
+
+def available_cpus():
+    """Return the number of CPUs this process may run on"""
+    try:
+        # Honours taskset/cgroup CPU pinning, which os.cpu_count() ignores
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Processes rendering inline thumbnails for /api/analyze; drawing runs in parallel
+# across cores regardless of whether the RDKit bindings release the GIL.
+# Set RENDER_PROCESSES in the environment to override.
+RENDER_PROCESSES = int(os.environ.get('RENDER_PROCESSES', 0)) or available_cpus()
+
+# Number of individually requested thumbnails kept in memory
+INDIVIDUAL_IMAGE_CACHE_SIZE = 4096
+
+# Number of pending/finished image jobs remembered for /api/analyze/<job_id>/...
+# and how long (seconds) each one stays available
+RENDER_JOB_LIMIT = 256
+RENDER_JOB_TTL = 300
+
+# Background renderer for images requested after /api/analyze has returned.
+# Threads start on first submit, so creating the pool before gunicorn forks is safe.
+render_executor = ThreadPoolExecutor(max_workers=MAX_RENDER_WORKERS)
+render_jobs = OrderedDict()  # job_id -> {'key': (key_type, key_input), 'matches': set, 'image': Future, 'expires': float}
+render_jobs_lock = threading.Lock()
+
+# Created on first use so that, under gunicorn --preload, the pool belongs to the
+# worker rather than the master; spawn avoids forking a multithreaded process
+render_process_pool = None
+render_process_pool_lock = threading.Lock()
+
+def get_render_process_pool():
+    """Return the thumbnail process pool, starting it on first use"""
+    global render_process_pool
+    with render_process_pool_lock:
+        if render_process_pool is None:
+            render_process_pool = ProcessPoolExecutor(
+                max_workers=RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=worker_init,
+                initargs=(ANALYZER_JSON_PATH,)
+            )
+        return render_process_pool
+
+def discard_render_process_pool(pool):
+    """Drop a broken thumbnail pool so the next request starts a fresh one"""
+    global render_process_pool
+    with render_process_pool_lock:
+        if render_process_pool is pool:
+            render_process_pool = None
+    pool.shutdown(wait=False)
+
+def fast_jsonify(obj):
+    """Serialize obj with orjson, which is much faster than jsonify for large image payloads"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 def initialize_analyzer():
     global analyzer
     try:
-        json_path = os.path.join(os.path.dirname(__file__), 'functional_group_with_chebi_updated.json')
-        analyzer = FunctionalGroupAnalyzer(json_path)
+        # Load eagerly so a broken catalog shows up here, not on the first request
+        analyzer = FunctionalGroupAnalyzer(ANALYZER_JSON_PATH).load()
+        # Cached results were computed against the previous analyzer
+        _match_cached.cache_clear()
+        _render_inline_images.cache_clear()
+        _render_main_image.cache_clear()
+        _render_match_image.cache_clear()
         print("✅ Functional Group Analyzer initialized successfully")
     except Exception as e:
         print(f"❌ Error initializing analyzer: {e}")
         analyzer = None
 
+def render_individual_images(mol, patterns, match_names, image_format='webp'):
+    """Render one highlight per functional group and return a list of (match_name, data URL)"""
+    rendered = []
+    try:
+        # Create images with only one functional group highlighted each
+        images = visualize_matches_batch(mol, patterns, match_names, img_size=THUMBNAIL_SIZE)
+    except Exception as e:
+        print(f"Error generating individual images: {e}")
+        return rendered
+
+    for match_name, individual_img in images.items():
+        try:
+            rendered.append((match_name, encode_thumbnail(individual_img, image_format)))
+        except Exception as e:
+            print(f"Error generating individual image for {match_name}: {e}")
+    return rendered
+
+def render_main_png(mol, patterns, matches):
+    """Render the molecule with all matches highlighted and return the PNG bytes (or None)"""
+    img = visualize_matches(mol, patterns, matches, img_size=MAIN_IMAGE_SIZE)
+    if not img:
+        return None
+    buffer = BytesIO()
+    img.save(buffer, format='PNG', compress_level=1, optimize=False)
+    return buffer.getvalue()
+
+def encode_main_image(mol, patterns, matches):
+    """Render the molecule with all matches highlighted and return it as base64 PNG (or None)"""
+    png = render_main_png(mol, patterns, matches)
+    return base64.b64encode(png).decode('ascii') if png else None
+
+def create_molecule(input_type, molecule_input):
+    """Create a Molecule from request input"""
+    if input_type == 'mol_file':
+        # MOL file content arrives as text, so parse it as a MOL block in memory
+        return Molecule(molecule_input, input_type='mol_block')
+    return Molecule(molecule_input, input_type=input_type)
+
+def analysis_cache_key(input_type, molecule_input, mol_obj):
+    """Return (key_type, key_input, canonical_smiles) identifying the molecule for caching
+
+    SMILES and MOL inputs are keyed on canonical SMILES so that equivalent
+    spellings of one molecule share a cache entry; SMARTS queries are kept verbatim.
+    'auto' is resolved the way Molecule resolves it, so a detected SMARTS query is
+    never canonicalized as if it were SMILES.
+    """
+    if input_type == 'auto':
+        input_type = Molecule._detect_input_type(molecule_input)
+    if input_type == 'smarts':
+        return 'smarts', molecule_input, None
+    canonical_smiles = Chem.MolToSmiles(mol_obj.mol, canonical=True)
+    return 'smiles', canonical_smiles, canonical_smiles
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _match_cached(input_type, molecule_input):
+    """Return the names of the functional groups matched by a cache key from analysis_cache_key"""
+    mol_obj = create_molecule(input_type, molecule_input)
+    return tuple(find_matches(mol_obj.mol, analyzer.get_compiled_patterns(),
+                              analyzer.get_filter_catalog()))
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _render_inline_images(input_type, molecule_input, matches, image_format, include_individual_images):
+    """Render the images returned inline by /api/analyze for a cache key and its matches
+
+    Returns (base64 overview PNG, ((match_name, data URL), ...)), or (None, ())
+    when there are no matches to highlight. Raises if any image of a match
+    fails to render, so a failure is retried on the next request rather than
+    cached.
+    """
+    if not matches:
+        return None, ()
+
+    mol_obj = create_molecule(input_type, molecule_input)
+
+    # Compiled patterns are built once by the analyzer; reuse them for the whole request
+    patterns = analyzer.get_compiled_patterns()
+
+    # Generate main molecule image with all functional groups highlighted
+    image_data = encode_main_image(mol_obj.mol, patterns, list(matches))
+    if image_data is None:
+        raise ValueError("Could not render molecule image")
+
+    # Generate individual functional group images in worker processes, one batch
+    # per process so each prepares the molecule for drawing only once
+    individual_images = ()
+    if include_individual_images:
+        workers = min(RENDER_PROCESSES, len(matches))
+        tasks = [(input_type, molecule_input, matches[i::workers], image_format)
+                 for i in range(workers)]
+        pool = get_render_process_pool()
+        rendered = {}
+        try:
+            for batch_result in pool.map(render_thumbnail_batch, tasks):
+                rendered.update(batch_result)
+        except BrokenProcessPool:
+            # A worker died; replace the pool so the next request starts afresh
+            discard_render_process_pool(pool)
+            raise
+        missing = [name for name in matches if name not in rendered]
+        if missing:
+            raise ValueError(f"Could not render images for: {', '.join(missing)}")
+        individual_images = tuple((name, rendered[name]) for name in matches)
+
+    return image_data, individual_images
+
+def analyze_input(input_type, molecule_input, image_format, include_images, include_individual_images):
+    """Build the /api/analyze result for a cache key from analysis_cache_key
+
+    Matches and rendered images come from caches shared between requests, but the
+    returned dict is built afresh each call, so callers are free to modify it.
+    """
+    matches = list(_match_cached(input_type, molecule_input))
+
+    # Get detailed information for each match, copied so the analyzer's own stay untouched
+    groups_data = analyzer.get_groups_data()
+
+    # Generate molecular visualization only when the caller asks for it
+    image_data = None
+    individual_images = {}
+    if include_images:
+        try:
+            image_data, rendered = _render_inline_images(
+                input_type, molecule_input, tuple(matches), image_format, include_individual_images)
+            individual_images = dict(rendered)
+        except Exception as e:
+            print(f"Error generating visualization: {e}")
+
+    return {
+        'matches': matches,
+        'groups_data': {name: copy.deepcopy(groups_data.get(name, {})) for name in matches},
+        'input_type': input_type,
+        'success': True,
+        'total_matches': len(matches),
+        'image': image_data,  # Base64 encoded main image
+        'individual_images': individual_images  # Individual functional group images as data URLs
+    }
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _render_main_image(input_type, molecule_input, matches):
+    """Render the highlighted overview PNG for a cache key and its matches"""
+    mol_obj = create_molecule(input_type, molecule_input)
+    return render_main_png(mol_obj.mol, analyzer.get_compiled_patterns(), list(matches))
+
+@lru_cache(maxsize=INDIVIDUAL_IMAGE_CACHE_SIZE)
+def _render_match_image(input_type, molecule_input, match_name, image_format):
+    """Render one functional group thumbnail for a cache key as a data URL (or None)"""
+    mol_obj = create_molecule(input_type, molecule_input)
+    rendered = render_individual_images(
+        mol_obj.mol, analyzer.get_compiled_patterns(), [match_name], image_format)
+    return rendered[0][1] if rendered else None
+
+def start_render_job(input_type, molecule_input, matches):
+    """Queue the overview image for background rendering and return its job id"""
+    job_id = uuid.uuid4().hex
+    future = render_executor.submit(_render_main_image, input_type, molecule_input, tuple(matches))
+    with render_jobs_lock:
+        render_jobs[job_id] = {
+            'key': (input_type, molecule_input),
+            'matches': set(matches),
+            'image': future,
+            'expires': time.monotonic() + RENDER_JOB_TTL
+        }
+        while len(render_jobs) > RENDER_JOB_LIMIT:
+            render_jobs.popitem(last=False)
+    return job_id
+
+def get_render_job(job_id):
+    """Return the job registered under job_id, or None if it is unknown or expired"""
+    now = time.monotonic()
+    with render_jobs_lock:
+        # Jobs are stored oldest first, so expired ones are always at the front
+        while render_jobs:
+            oldest_id, oldest = next(iter(render_jobs.items()))
+            if oldest['expires'] > now:
+                break
+            del render_jobs[oldest_id]
+        return render_jobs.get(job_id)
+
 @app.route('/')
 def home():
-    return jsonify({
+    return fast_jsonify({
         "message": "Functional Group Analyzer API",
         "status": "running",
         "version": "1.0.0",
         "endpoints": {
             "analyze": "/api/analyze",
+            "analysis_image": "/api/analyze/<job_id>/image",
+            "analysis_png": "/api/analyze/<job_id>/main.png",
+            "group_image": "/api/analyze/<job_id>/image/<match_name>",
             "health": "/api/health"
         }
     })
 
 @app.route('/api/health')
 def health():
-    return jsonify({
+    return fast_jsonify({
         "status": "healthy",
         "analyzer_loaded": analyzer is not None
     })
@@ -53,132 +338,156 @@ def analyze_molecule():
         data = request.json
         molecule_input = data.get('input')
         input_type = data.get('type', 'smiles')
+        image_format = data.get('image_format', 'webp')
+        include_images = bool(data.get('include_images', False))
+        # Thumbnails are only rendered alongside the main image
+        include_individual_images = include_images and bool(data.get('include_individual_images', True))
         
         if not molecule_input:
-            return jsonify({"error": "No molecule input provided"}), 400
+            return fast_jsonify({"error": "No molecule input provided"}), 400
         
-        if analyzer is None:
-            return jsonify({"error": "Analyzer not initialized"}), 500
-        
-        # Create molecule object
-        if input_type == 'mol_file':
-            # For MOL files, write to temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.mol', delete=False) as tmp_file:
-                tmp_file.write(molecule_input)
-                tmp_file_path = tmp_file.name
-            
-            try:
-                mol_obj = Molecule(tmp_file_path, input_type='mol_file')
-            finally:
-                os.unlink(tmp_file_path)
-        else:
-            mol_obj = Molecule(molecule_input, input_type=input_type)
+        if image_format not in THUMBNAIL_FORMATS:
+            return fast_jsonify({"error": f"Unsupported image format: {image_format}"}), 400
         
-        # Find matches
-        matches = find_matches(mol_obj.mol, analyzer.get_compiled_patterns())
+        # Everything but MOL file content is a line notation, including 'auto' input
+        if input_type != 'mol_file':
+            if len(molecule_input) > MAX_SMILES_LENGTH:
+                return fast_jsonify({"error": f"Input too long (maximum {MAX_SMILES_LENGTH} characters)"}), 413
+            if REPEATED_CHARS_RE.search(molecule_input):
+                return fast_jsonify({"error": "Input contains an overly long run of repeated characters"}), 413
         
-        # Get detailed information for each match
-        groups_data = analyzer.get_groups_data()
+        if analyzer is None:
+            return fast_jsonify({"error": "Analyzer not initialized"}), 500
         
-        # Generate molecular visualization
-        image_data = None
-        individual_images = {}
-        try:
-            from FunctionalCatalog import visualize_matches, show_individual_matches
-            import base64
-            from io import BytesIO
-            
-            # Generate main molecule image with all functional groups highlighted
-            img = visualize_matches(mol_obj.mol, analyzer.get_compiled_patterns(), matches)
-            if img:
-                buffer = BytesIO()
-                img.save(buffer, format='PNG')
-                buffer.seek(0)
-                image_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            # Generate individual functional group images
-            for match_name in matches:
-                try:
-                    # Create image with only this functional group highlighted
-                    individual_img = visualize_matches(
-                        mol_obj.mol, 
-                        analyzer.get_compiled_patterns(), 
-                        [match_name],
-                        img_size=(300, 300)
-                    )
-                    if individual_img:
-                        buffer = BytesIO()
-                        individual_img.save(buffer, format='PNG')
-                        buffer.seek(0)
-                        individual_images[match_name] = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                except Exception as e:
-                    print(f"Error generating individual image for {match_name}: {e}")
-                    
-        except Exception as e:
-            print(f"Error generating visualization: {e}")
+        # Parse up front so equivalent inputs map to the same cached analysis
+        mol_obj = create_molecule(input_type, molecule_input)
+        key_type, key_input, canonical_smiles = analysis_cache_key(input_type, molecule_input, mol_obj)
         
-        result = {
-            'matches': matches,
-            'groups_data': {name: groups_data.get(name, {}) for name in matches},
-            'input_type': input_type,
-            'success': True,
-            'total_matches': len(matches),
-            'image': image_data,  # Base64 encoded main image
-            'individual_images': individual_images  # Individual functional group images
-        }
+        result = analyze_input(key_type, key_input, image_format,
+                               include_images, include_individual_images)
+        result['input_type'] = input_type
+        result['canonical_smiles'] = canonical_smiles
+        # Images not returned inline can be fetched from the job endpoints;
+        # the overview starts rendering now so it is ready when the client asks.
+        # Without matches there is nothing to highlight and no overview to fetch.
+        if include_images or not result['matches']:
+            result['job_id'] = None
+            result['image_url'] = None
+        else:
+            job_id = start_render_job(key_type, key_input, result['matches'])
+            result['job_id'] = job_id
+            result['image_url'] = f"/api/analyze/{job_id}/main.png"
         
-        return jsonify(result)
+        return fast_jsonify(result)
         
     except Exception as e:
         print(f"Error in analyze_molecule: {str(e)}")
-        return jsonify({
+        return fast_jsonify({
             'error': str(e),
             'success': False
         }), 500
 
+@app.route('/api/analyze/<job_id>/image')
+def analysis_image(job_id):
+    """Get the overview image of an analysis with all functional groups highlighted"""
+    try:
+        job = get_render_job(job_id)
+        if job is None:
+            return fast_jsonify({"error": "Unknown or expired analysis job"}), 404
+        
+        png = job['image'].result()
+        return fast_jsonify({
+            "job_id": job_id,
+            "image": base64.b64encode(png).decode('ascii') if png else None  # Base64 encoded PNG
+        })
+    except Exception as e:
+        return fast_jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/<job_id>/main.png')
+def analysis_png(job_id):
+    """Serve the overview image of an analysis as raw PNG, without base64 or JSON wrapping"""
+    try:
+        job = get_render_job(job_id)
+        if job is None:
+            return fast_jsonify({"error": "Unknown or expired analysis job"}), 404
+        
+        png = job['image'].result()
+        if not png:
+            return fast_jsonify({"error": "Could not render molecule image"}), 500
+        
+        # A job's image never changes, so the job id doubles as the ETag
+        return send_file(BytesIO(png), mimetype='image/png', conditional=True,
+                         etag=job_id, max_age=RENDER_JOB_TTL)
+    except Exception as e:
+        return fast_jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/<job_id>/image/<path:match_name>')
+def group_image(job_id, match_name):
+    """Get a thumbnail highlighting a single matched functional group"""
+    try:
+        image_format = request.args.get('image_format', 'webp')
+        if image_format not in THUMBNAIL_FORMATS:
+            return fast_jsonify({"error": f"Unsupported image format: {image_format}"}), 400
+        
+        job = get_render_job(job_id)
+        if job is None:
+            return fast_jsonify({"error": "Unknown or expired analysis job"}), 404
+        if match_name not in job['matches']:
+            return fast_jsonify({"error": f"'{match_name}' is not a match of this analysis"}), 404
+        
+        input_type, molecule_input = job['key']
+        return fast_jsonify({
+            "job_id": job_id,
+            "match": match_name,
+            "image": _render_match_image(input_type, molecule_input, match_name, image_format)
+        })
+    except Exception as e:
+        return fast_jsonify({"error": str(e)}), 500
+
 @app.route('/api/functional-groups')
 def list_functional_groups():
     """Get list of all available functional groups"""
     try:
         if analyzer is None:
-            return jsonify({"error": "Analyzer not initialized"}), 500
+            return fast_jsonify({"error": "Analyzer not initialized"}), 500
         
         groups = analyzer.list_all_groups()
         categories = analyzer.get_all_categories()
         
-        return jsonify({
+        return fast_jsonify({
             "total_groups": len(groups),
             "groups": groups[:50],  # Return first 50 for performance
             "categories": categories
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return fast_jsonify({"error": str(e)}), 500
 
 @app.route('/api/search/<search_term>')
 def search_groups(search_term):
     """Search functional groups by term"""
     try:
         if analyzer is None:
-            return jsonify({"error": "Analyzer not initialized"}), 500
+            return fast_jsonify({"error": "Analyzer not initialized"}), 500
         
         matches = analyzer.search_groups(search_term)
-        return jsonify({
+        return fast_jsonify({
             "search_term": search_term,
             "matches": matches,
             "total": len(matches)
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return fast_jsonify({"error": str(e)}), 500
 
-if __name__ == '__main__':
-    # Initialize analyzer on startup
+# Initialize analyzer once when the module is imported; under gunicorn --preload
+# this happens in the master and the loaded patterns are shared with the workers.
+# Spawned render workers re-import `python app.py` as __mp_main__ and load their
+# own analyzer in worker_init, so they skip this.
+if analyzer is None and __name__ != '__mp_main__':
     initialize_analyzer()
-    
+
+if __name__ == '__main__':
     # Get port from environment variable (Render requirement)
     port = int(os.environ.get('PORT', 5000))
     
     # Run the app
     app.run(host='0.0.0.0', port=port, debug=False)
-
-# Initialize analyzer when module is imported (for gunicorn)
-initialize_analyzer()
\ No newline at end of file
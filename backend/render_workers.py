@@ -0,0 +1,61 @@
+"""Thumbnail rendering shared by the Flask app and its render worker processes
+
+Worker processes only import this module and FunctionalCatalog, so they start
+without Flask and keep their own pre-loaded FunctionalGroupAnalyzer.
+"""
+import base64
+from io import BytesIO
+
+from FunctionalCatalog import FunctionalGroupAnalyzer, Molecule, visualize_matches_batch
+
+# Pixel size of the individual functional group thumbnails
+THUMBNAIL_SIZE = (300, 300)
+
+# Encoder settings for individual functional group thumbnails, keyed by image_format
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 0}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 80}),
+    'png': ('PNG', 'image/png', {'compress_level': 1, 'optimize': False}),
+}
+
+# Per-process state, set up by worker_init
+_analyzer = None
+
+def encode_thumbnail(img, image_format):
+    """Encode a PIL thumbnail as a data URL in the given image_format"""
+    pil_format, mime_type, save_options = THUMBNAIL_FORMATS[image_format]
+    if pil_format != 'PNG':
+        # Lossy thumbnail formats carry no alpha channel
+        img = img.convert('RGB')
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **save_options)
+    encoded = base64.b64encode(buffer.getbuffer()).decode('ascii')
+    return f"data:{mime_type};base64,{encoded}"
+
+def worker_init(json_path):
+    """Load the analyzer once per worker process"""
+    global _analyzer
+    _analyzer = FunctionalGroupAnalyzer(json_path).load()
+
+def render_thumbnail_batch(task):
+    """Render thumbnails in a worker process and return a list of (match_name, data URL)
+
+    task is (input_type, molecule_input, match_names, image_format); the molecule is
+    sent as its SMILES/SMARTS string, which is far cheaper to pass than a pickled Mol.
+    """
+    input_type, molecule_input, match_names, image_format = task
+    rendered = []
+    try:
+        mol_obj = Molecule(molecule_input, input_type=input_type)
+        images = visualize_matches_batch(mol_obj.mol, _analyzer.get_compiled_patterns(),
+                                         list(match_names), img_size=THUMBNAIL_SIZE)
+    except Exception as e:
+        print(f"Error generating individual images: {e}")
+        return rendered
+
+    for match_name, individual_img in images.items():
+        try:
+            rendered.append((match_name, encode_thumbnail(individual_img, image_format)))
+        except Exception as e:
+            print(f"Error generating individual image for {match_name}: {e}")
+    return rendered
@@ -0,0 +1,89 @@
+"""Tests for the Flask endpoints, run against the bundled catalog
+
+Run from the backend directory with: python -m unittest test_app
+"""
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+
+
+# A molecule none of the catalog's functional groups match
+NO_MATCH_SMILES = '[Ar]'
+
+
+class AnalyzeTest(unittest.TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        if app.render_process_pool is not None:
+            app.discard_render_process_pool(app.render_process_pool)
+
+    def setUp(self):
+        self.client = app.app.test_client()
+        app._match_cached.cache_clear()
+        app._render_inline_images.cache_clear()
+
+    def analyze(self, smiles, **options):
+        response = self.client.post('/api/analyze', json={'input': smiles, **options})
+        return response.status_code, response.get_json()
+
+    def test_overview_job_for_matches(self):
+        status, result = self.analyze('CCO')
+        self.assertEqual(status, 200)
+        self.assertIn('ethanol', result['matches'])
+        self.assertEqual(result['image_url'], f"/api/analyze/{result['job_id']}/main.png")
+
+        png = self.client.get(result['image_url'])
+        self.assertEqual(png.status_code, 200)
+        self.assertEqual(png.mimetype, 'image/png')
+
+    def test_no_overview_job_without_matches(self):
+        status, result = self.analyze(NO_MATCH_SMILES)
+        self.assertEqual(status, 200)
+        self.assertEqual(result['matches'], [])
+        self.assertIsNone(result['job_id'])
+        self.assertIsNone(result['image_url'])
+
+    def test_inline_images_without_matches(self):
+        status, result = self.analyze(NO_MATCH_SMILES, include_images=True)
+        self.assertEqual(status, 200)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['matches'], [])
+        self.assertIsNone(result['image'])
+        self.assertEqual(result['individual_images'], {})
+
+    def test_inline_images(self):
+        status, result = self.analyze('CCO', include_images=True, image_format='png')
+        self.assertEqual(status, 200)
+        self.assertTrue(result['image'])
+        self.assertEqual(list(result['individual_images']), result['matches'])
+        self.assertTrue(all(url.startswith('data:image/png;base64,')
+                            for url in result['individual_images'].values()))
+
+    def test_render_failure_is_not_cached(self):
+        with mock.patch.object(app, 'encode_main_image', return_value=None), \
+                contextlib.redirect_stdout(io.StringIO()):
+            status, result = self.analyze('CCO', include_images=True,
+                                          include_individual_images=False)
+        self.assertEqual(status, 200)
+        self.assertTrue(result['matches'])
+        self.assertIsNone(result['image'])
+
+        # The next request renders again instead of getting the failure from the cache
+        status, result = self.analyze('CCO', include_images=True, include_individual_images=False)
+        self.assertEqual(status, 200)
+        self.assertTrue(result['image'])
+
+    def test_result_is_not_shared_between_requests(self):
+        _, first = self.analyze('CCO')
+        _, second = self.analyze('OCC')
+        self.assertEqual(first['matches'], second['matches'])
+        self.assertNotEqual(first['job_id'], second['job_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests for the columnar catalog file written by _write_catalog
+
+Run from the backend directory with: python -m unittest test_catalog_file
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import FunctionalCatalog as fc
+
+
+CATALOG = os.path.join(os.path.dirname(__file__), 'functional_group_with_chebi_updated.json')
+
+# Groups with keys outside CATALOG_COLUMNS, missing keys and a reactivity that is not coded
+IRREGULAR_GROUPS = [
+    {'id': 'fg_001', 'name': 'alcohol', 'smarts': '[OX2H]', 'reactivity': 'moderate',
+     'examples': ['ethanol'], 'needs_manual_review': True},
+    {'name': 'nitrile', 'smarts': 'C#N', 'source': 'manual', 'definition': 'R-C≡N'},
+    {'id': 'fg_003', 'smarts': '[#6]=O', 'name': 'carbonyl', 'reactivity': 'high'},
+]
+
+
+class CatalogFileTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bundled = fc._read_catalog(CATALOG)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_file = os.path.join(self.tmp_dir, 'catalog.json')
+
+    def tearDown(self):
+        fc._forget_shared_analyzer(self.json_file)
+        shutil.rmtree(self.tmp_dir)
+
+    def assertRoundTrips(self, data, pretty=False):
+        fc._write_catalog(data, self.json_file, pretty=pretty)
+
+        with open(self.json_file, encoding='utf-8') as f:
+            table = json.load(f)['functional_groups']
+        self.assertEqual(set(table), {'columns', 'codes', 'rows'})
+        self.assertEqual(len(table['rows']), len(data['functional_groups']))
+
+        self.assertEqual(fc._read_catalog(self.json_file), data)
+        self.assertEqual(fc._load_catalog(self.json_file)[0], data)
+        self.assertEqual(list(fc._stream_catalog_groups(self.json_file)), data['functional_groups'])
+
+    def test_bundled_catalog_round_trips(self):
+        self.assertRoundTrips(self.bundled)
+
+    def test_pretty_catalog_round_trips(self):
+        self.assertRoundTrips(self.bundled, pretty=True)
+
+    def test_round_trip_without_orjson(self):
+        with mock.patch.object(fc, 'orjson', None):
+            self.assertRoundTrips(self.bundled)
+
+    def test_irregular_groups_round_trip(self):
+        self.assertRoundTrips({'metadata': {'total_groups': 3}, 'functional_groups': IRREGULAR_GROUPS})
+
+        with open(self.json_file, encoding='utf-8') as f:
+            table = json.load(f)['functional_groups']
+        self.assertEqual(table['codes'], {'reactivity': ['high', 'moderate']})
+
+        # A column holding anything but strings is stored as is
+        groups = [dict(group) for group in IRREGULAR_GROUPS]
+        groups[1]['reactivity'] = 3
+        self.assertRoundTrips({'metadata': {'total_groups': 3}, 'functional_groups': groups})
+
+    def test_list_catalog_is_read(self):
+        data = {'metadata': {'total_groups': 3}, 'functional_groups': IRREGULAR_GROUPS}
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        self.assertEqual(fc._read_catalog(self.json_file), data)
+        self.assertEqual(list(fc._stream_catalog_groups(self.json_file)), IRREGULAR_GROUPS)
+
+
+if __name__ == '__main__':
+    unittest.main()
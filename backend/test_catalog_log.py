@@ -0,0 +1,213 @@
+"""Tests for the functional group catalog's append log, its replay and compaction
+
+Run from the backend directory with: python -m unittest test_catalog_log
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import FunctionalCatalog as fc
+
+
+BASE_GROUPS = [
+    {'id': 'fg_001', 'name': 'alcohol', 'smarts': '[OX2H]', 'description': 'Hydroxyl group',
+     'reactivity': 'moderate'},
+    {'id': 'fg_002', 'name': 'ketone', 'smarts': '[#6][CX3](=O)[#6]', 'description': 'Carbonyl group',
+     'reactivity': 'high'},
+]
+
+
+def new_group(name):
+    return {'name': name, 'smarts': 'C', 'description': f'{name} group'}
+
+
+class CatalogTestCase(unittest.TestCase):
+    """Base for tests that work on a fresh two-group catalog in a temporary directory"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_file = os.path.join(self.tmp_dir, 'catalog.json')
+        fc._write_catalog({'metadata': {'total_groups': len(BASE_GROUPS)},
+                           'functional_groups': [dict(group) for group in BASE_GROUPS]},
+                          self.json_file)
+
+    def tearDown(self):
+        fc._forget_shared_analyzer(self.json_file)
+        shutil.rmtree(self.tmp_dir)
+
+    def quietly(self, func, *args):
+        """Call func and return (result, printed output)"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            result = func(*args)
+        return result, out.getvalue()
+
+
+class CatalogLogTest(CatalogTestCase):
+
+    def read_groups(self):
+        data = fc._read_catalog(self.json_file)
+        return {group['name']: group['id'] for group in data['functional_groups']}, data
+
+    def test_add_is_appended_to_log(self):
+        with open(self.json_file, 'rb') as f:
+            before = f.read()
+
+        added, output = self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)
+
+        self.assertTrue(added)
+        self.assertIn("'ester' with ID fg_003", output)
+        with open(self.json_file, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertTrue(os.path.exists(fc._catalog_log_path(self.json_file)))
+
+        groups, data = self.read_groups()
+        self.assertEqual(groups, {'alcohol': 'fg_001', 'ketone': 'fg_002', 'ester': 'fg_003'})
+        self.assertEqual(data['metadata']['total_groups'], 3)
+
+    def test_remove_and_readd(self):
+        self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)
+        self.assertTrue(self.quietly(fc.remove_functional_group, 'ester', self.json_file)[0])
+        self.assertTrue(self.quietly(fc.remove_functional_group, 'alcohol', self.json_file)[0])
+
+        groups, data = self.read_groups()
+        self.assertEqual(groups, {'ketone': 'fg_002'})
+        self.assertEqual(data['metadata']['total_groups'], 1)
+
+        # The removed ester keeps its ID; the new one gets the next
+        added, output = self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)
+        self.assertTrue(added)
+        self.assertIn("'ester' with ID fg_004", output)
+
+        groups, data = self.read_groups()
+        self.assertEqual(groups, {'ketone': 'fg_002', 'ester': 'fg_004'})
+        self.assertEqual(data['metadata']['total_groups'], 2)
+
+    def test_duplicate_name_is_refused(self):
+        self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)
+        log_path = fc._catalog_log_path(self.json_file)
+        log_size = os.path.getsize(log_path)
+
+        self.assertFalse(self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)[0])
+        self.assertFalse(self.quietly(fc.add_functional_group, new_group('ketone'), self.json_file)[0])
+        self.assertEqual(os.path.getsize(log_path), log_size)
+
+    def test_id_sequence(self):
+        count, _ = self.quietly(
+            fc.add_functional_groups, [new_group('a'), new_group('b'), new_group('a')], self.json_file)
+        self.assertEqual(count, 2)
+        self.quietly(fc.remove_functional_group, 'b', self.json_file)
+        self.quietly(fc.add_functional_group, new_group('c'), self.json_file)
+
+        groups, _ = self.read_groups()
+        self.assertEqual(groups, {'alcohol': 'fg_001', 'ketone': 'fg_002', 'a': 'fg_003', 'c': 'fg_005'})
+
+    def test_ids_ignore_removed_highest_id(self):
+        # The counter is seeded from the catalog before the log's removals apply
+        self.quietly(fc.remove_functional_group, 'ketone', self.json_file)
+        _, output = self.quietly(fc.add_functional_group, new_group('ester'), self.json_file)
+        self.assertIn("'ester' with ID fg_003", output)
+
+        groups, _ = self.read_groups()
+        self.assertEqual(groups, {'alcohol': 'fg_001', 'ester': 'fg_003'})
+
+    def test_compaction_keeps_groups_and_ids(self):
+        self.quietly(fc.add_functional_groups, [new_group('a'), new_group('b')], self.json_file)
+        self.quietly(fc.remove_functional_group, 'alcohol', self.json_file)
+        _, before = self.read_groups()
+
+        fc.compact_catalog(self.json_file)
+
+        self.assertFalse(os.path.exists(fc._catalog_log_path(self.json_file)))
+        _, after = self.read_groups()
+        self.assertEqual(after['functional_groups'], before['functional_groups'])
+        self.assertEqual(after['metadata']['total_groups'], 3)
+
+        # IDs keep counting from where the log left off
+        _, output = self.quietly(fc.add_functional_group, new_group('c'), self.json_file)
+        self.assertIn("'c' with ID fg_005", output)
+
+    def crash_while_compacting(self):
+        """Compact the catalog, then put the log back as if the process died before removing it"""
+        log_path = fc._catalog_log_path(self.json_file)
+        with open(log_path, 'rb') as f:
+            log_bytes = f.read()
+        fc.compact_catalog(self.json_file)
+        with open(log_path, 'wb') as f:
+            f.write(log_bytes)
+
+    def test_log_left_by_crash_is_not_replayed_twice(self):
+        self.quietly(fc.add_functional_group, new_group('a'), self.json_file)
+        self.quietly(fc.remove_functional_group, 'a', self.json_file)
+        self.quietly(fc.add_functional_groups, [new_group('a'), new_group('b')], self.json_file)
+        before, _ = self.read_groups()
+
+        self.crash_while_compacting()
+
+        groups, data = self.read_groups()
+        self.assertEqual(groups, before)
+        self.assertEqual(data['metadata']['total_groups'], 4)
+        self.assertEqual(fc._load_catalog(self.json_file)[0]['functional_groups'],
+                         data['functional_groups'])
+        self.assertEqual([group['name'] for group in fc._stream_catalog_groups(self.json_file)],
+                         list(groups))
+
+        # Edits appended after the crash still apply, and IDs carry on
+        self.assertFalse(self.quietly(fc.add_functional_group, new_group('b'), self.json_file)[0])
+        _, output = self.quietly(fc.add_functional_group, new_group('c'), self.json_file)
+        self.assertIn("'c' with ID fg_006", output)
+        self.quietly(fc.remove_functional_group, 'alcohol', self.json_file)
+
+        groups, _ = self.read_groups()
+        self.assertEqual(groups, {'ketone': 'fg_002', 'a': 'fg_004', 'b': 'fg_005', 'c': 'fg_006'})
+        self.assertEqual([group['name'] for group in fc._stream_catalog_groups(self.json_file)],
+                         list(groups))
+
+        fc.compact_catalog(self.json_file)
+        self.assertEqual(self.read_groups()[0], groups)
+
+    def test_cached_load_sees_every_edit(self):
+        def names():
+            data, _ = fc._load_catalog(self.json_file)
+            return {group['name'] for group in data['functional_groups']}
+
+        # Edits can land within one mtime tick of the cache being written
+        for _ in range(5):
+            self.quietly(fc.add_functional_group, new_group('zz'), self.json_file)
+            self.assertIn('zz', names())
+            self.quietly(fc.remove_functional_group, 'zz', self.json_file)
+            self.assertNotIn('zz', names())
+
+        self.quietly(fc.add_functional_group, new_group('yy'), self.json_file)
+        self.assertIn('yy', names())
+        os.remove(fc._catalog_log_path(self.json_file))
+        self.assertEqual(names(), {'alcohol', 'ketone'})
+
+
+class SharedAnalyzerTest(CatalogTestCase):
+
+    def test_refresh_does_not_undo_an_edit(self):
+        json_file = os.path.abspath(self.json_file)
+        stale = fc._shared_analyzer(json_file)
+        stamp = fc._catalog_stamp(json_file)
+
+        # An edit in this process drops the analyzer while a refresh is loading
+        self.quietly(fc.add_functional_group, new_group('ester'), json_file)
+        current = fc._shared_analyzer(json_file)
+        self.assertIn('ester', current.list_all_groups())
+
+        fc._refresh_shared_analyzer(json_file, stamp, stale)
+        self.assertIs(fc._shared_analyzer(json_file), current)
+
+    def test_refresh_replaces_the_stale_analyzer(self):
+        json_file = os.path.abspath(self.json_file)
+        stale = fc._shared_analyzer(json_file)
+        fc._refresh_shared_analyzer(json_file, fc._catalog_stamp(json_file), stale)
+        self.assertIsNot(fc._shared_analyzer(json_file), stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
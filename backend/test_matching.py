@@ -0,0 +1,83 @@
+"""Tests that the matcher finds what the original per-pattern loop found, over the bundled catalog
+
+Run from the backend directory with: python -m unittest test_matching
+"""
+import contextlib
+import io
+import os
+import unittest
+
+from rdkit import Chem
+
+import FunctionalCatalog as fc
+
+
+CATALOG = os.path.join(os.path.dirname(__file__), 'functional_group_with_chebi_updated.json')
+
+# Neutral, charged, explicit-H and multi-fragment targets across the catalog's elements
+MOLECULES = ['CCO', '[H]OC([H])([H])C', 'CC(=O)Oc1ccccc1C(=O)O', 'OCC(N)C(=O)O', 'c1ccncc1CCBr',
+             'CC=O', 'CC(=O)[O-]', 'C[N+](C)(C)C', 'O=[N+]([O-])c1ccccc1', 'CS(=O)(=O)N',
+             'OP(=O)(O)OC', 'CCS', 'C=CC#N', 'CC=NC', 'OB(O)c1ccccc1', 'C[SiH3]', '[Na+].[Cl-]',
+             'C1CCC2(CC1)OCCO2', 'O=C1NC(=O)c2ccccc21', 'FC(F)(F)c1ccc(I)cc1', '[NH4+]', 'O', '[Ar]']
+
+
+def baseline_find_matches(target_mol, compiled_patterns):
+    """The matcher as first written: every pattern against every hydrogen variant"""
+    target_with_h = fc.safe_add_hs(target_mol)
+    target_no_h = fc.safe_remove_hs(target_mol)
+    matches_keys = []
+    for pattern_name, pattern_mol in compiled_patterns.items():
+        if (target_mol.HasSubstructMatch(pattern_mol)
+                or (target_with_h and target_with_h.HasSubstructMatch(pattern_mol))
+                or (target_no_h and target_no_h.HasSubstructMatch(pattern_mol))):
+            matches_keys.append(pattern_name)
+    return sorted(matches_keys)
+
+
+def target_molecules():
+    """Yield (label, molecule) for MOLECULES, plus one built with every H explicit"""
+    for smiles in MOLECULES:
+        yield smiles, Chem.MolFromSmiles(smiles)
+    yield 'AddHs(CCO)', Chem.AddHs(Chem.MolFromSmiles('CCO'))
+
+
+class MatchEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.analyzer = fc.FunctionalGroupAnalyzer(CATALOG).load()
+        cls.patterns = cls.analyzer.get_compiled_patterns()
+
+    def test_pattern_loop_matches_baseline(self):
+        for label, mol in target_molecules():
+            with self.subTest(target=label):
+                self.assertEqual(fc.find_matches(mol, self.patterns),
+                                 baseline_find_matches(mol, self.patterns))
+
+    def test_filter_catalog_matches_baseline(self):
+        filter_catalog = self.analyzer.get_filter_catalog()
+        for label, mol in target_molecules():
+            with self.subTest(target=label):
+                self.assertEqual(fc.find_matches(mol, self.patterns, filter_catalog),
+                                 baseline_find_matches(mol, self.patterns))
+
+    def test_skipped_with_h_search_finds_nothing_new(self):
+        # Patterns that do not need explicit H match the with-H variant only if
+        # they also match the original or the no-H variant
+        skipped = {name: pattern for name, pattern in self.patterns.items()
+                   if not fc.pattern_needs_explicit_h(pattern)}
+        self.assertTrue(skipped)
+        for label, mol in target_molecules():
+            target_with_h, target_no_h = fc.hydrogen_variants(mol)
+            if target_with_h is None:
+                continue
+            for name, pattern in skipped.items():
+                if target_with_h.HasSubstructMatch(pattern):
+                    with self.subTest(target=label, pattern=name):
+                        self.assertTrue(mol.HasSubstructMatch(pattern)
+                                        or target_no_h.HasSubstructMatch(pattern))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Tests for match highlighting images, run against the bundled catalog
+
+Run from the backend directory with: python -m unittest test_rendering
+"""
+import contextlib
+import io
+import os
+import unittest
+
+import FunctionalCatalog as fc
+
+
+CATALOG = os.path.join(os.path.dirname(__file__), 'functional_group_with_chebi_updated.json')
+
+# Molecules of different sizes, drawn one after another
+MOLECULES = ['CC(=O)Oc1ccccc1C(=O)O', 'OCC(N)C(=O)O', 'c1ccncc1CCBr']
+
+
+class RenderingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.analyzer = fc.FunctionalGroupAnalyzer(CATALOG).load()
+
+    def test_batch_matches_single_renders(self):
+        patterns = self.analyzer.get_compiled_patterns()
+        for smiles in MOLECULES:
+            with self.subTest(smiles=smiles):
+                mol = fc.Molecule(smiles, input_type='smiles').mol
+                matches = fc.find_matches(mol, patterns, self.analyzer.get_filter_catalog())
+                self.assertTrue(matches)
+
+                images = fc.visualize_matches_batch(mol, patterns, matches)
+                self.assertEqual(list(images), matches)
+                for name in matches:
+                    single = fc.visualize_matches(mol, patterns, [name], img_size=(300, 300))
+                    self.assertEqual(images[name].tobytes(), single.tobytes(), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,58 @@
-from rdkit import Chem
+import rdkit
+from rdkit import Chem, DataStructs
 from rdkit.Chem import Draw
 from rdkit.Chem.Draw import rdMolDraw2D
 from rdkit.Chem import AllChem
 import json
+import mmap
+import os
+import glob
+import pickle
+import hashlib
+import re
+import threading
+import uuid
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import fcntl
+except ImportError:
+    # fcntl is POSIX-only; on other platforms catalog edits are not locked
+    fcntl = None
+try:
+    import ijson
+except ImportError:
+    # ijson is optional; the streaming listings then load the whole catalog
+    ijson = None
 import matplotlib.pyplot as plt
 from PIL import Image
 import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    from joblib import Parallel, delayed
+except ImportError:
+    # joblib is optional; parallel matching falls back to concurrent.futures
+    Parallel = None
+    delayed = None
+
+try:
+    from IPython import get_ipython
+    from IPython.display import SVG, display
+except ImportError:
+    # IPython is optional; outside notebooks images are shown through matplotlib
+    get_ipython = None
 
 
 class Molecule:
-    def __init__(self, input_data, input_type='auto', sanitize=False, add_hs=False):
+    def __init__(self, input_data, input_type='auto', sanitize=False, add_hs=False,
+                 compute_coords=False):
         self.mol = None
         self.input_type = input_type
 
@@ -37,8 +80,20 @@ class Molecule:
             # Re-initialize ring info after adding hydrogens
             self._initialize_ring_info()
 
-        if input_type in ['smiles', 'mol_file']:
+        # 2D coordinates are only needed for drawing, so they are computed on demand.
+        # Computing them used to also fill in implicit valences, which the unsanitized
+        # molecule needs for AddHs and H-count queries, so do that part here.
+        self._needs_2d_coords = input_type in ['smiles', 'mol_file']
+        if self._needs_2d_coords:
+            self.mol.UpdatePropertyCache(strict=False)
+        if compute_coords:
+            self.ensure_2d_coords()
+
+    def ensure_2d_coords(self):
+        """Compute 2D coordinates for drawing once (SMARTS queries are left as they are)"""
+        if self._needs_2d_coords:
             AllChem.Compute2DCoords(self.mol)
+            self._needs_2d_coords = False
 
     def _initialize_ring_info(self):
         """Initialize ring information to prevent RingInfo errors"""
@@ -53,7 +108,8 @@ class Molecule:
                 except Exception as e:
                     print(f"Warning: Could not initialize ring info: {e}")
 
-    def _detect_input_type(self, input_data):
+    @staticmethod
+    def _detect_input_type(input_data):
         if input_data.endswith('.mol') or input_data.endswith('.sdf'):
             return 'mol_file'
         elif '[' in input_data or '#' in input_data or any(c in input_data for c in '!@$%'):
@@ -65,39 +121,125 @@ class Molecule:
 class FunctionalGroupAnalyzer:
     """Class to manage functional group JSON data and analysis"""
 
-    def __init__(self, json_file="functional_group_with_chebi_updated.json"):
-        """Initialize with JSON file path"""
+    def __init__(self, json_file="functional_group_with_chebi_updated.json", n_jobs=1,
+                 pattern_cache=True):
+        """Initialize with JSON file path
+
+        n_jobs > 1 (or -1 for all cores) compiles the SMARTS patterns in worker processes.
+        pattern_cache keeps compiled patterns in a pickle next to the JSON file,
+        reused on later starts for as long as the JSON content is unchanged.
+
+        Nothing is read here: the catalog is parsed on the first lookup and the
+        SMARTS patterns are compiled the first time they are needed. Call load()
+        to do both up front.
+        """
         self.json_file = json_file
-        self.raw_data = None
-        self.groups_data = None
-        self.smarts_library = None
-        self.compiled_patterns = None
-        self._load_data()
+        self.n_jobs = n_jobs
+        self.pattern_cache = pattern_cache
+        self.json_digest = None
+        self._raw_data = None
+        self._groups_data = None
+        self._smarts_library = None
+        self._compiled_patterns = None
+        self._pattern_fingerprints = None
+        self._by_category = None
+        self._by_reactivity = None
+        self._all_categories = None
+        self._search_tokens = None
+
+    def load(self):
+        """Parse the catalog and compile the patterns now rather than on first use
+
+        Returns:
+            FunctionalGroupAnalyzer: self
+        """
+        self._ensure_patterns()
+        return self
+
+    def _ensure_data(self):
+        """Parse the catalog and build the lookup indexes unless that is done already"""
+        if self._groups_data is None:
+            self._load_data()
+
+    def _ensure_patterns(self):
+        """Compile the SMARTS patterns unless that is done already"""
+        if self._compiled_patterns is None:
+            self._ensure_data()
+            self._load_patterns()
+
+    @property
+    def raw_data(self):
+        """The parsed JSON catalog, loaded on first access"""
+        self._ensure_data()
+        return self._raw_data
+
+    @property
+    def groups_data(self):
+        """Group name -> group details, loaded on first access"""
+        self._ensure_data()
+        return self._groups_data
+
+    @property
+    def smarts_library(self):
+        """Group name -> SMARTS string, loaded on first access"""
+        self._ensure_data()
+        return self._smarts_library
+
+    @property
+    def compiled_patterns(self):
+        """Group name -> compiled pattern Mol, compiled on first access"""
+        self._ensure_patterns()
+        return self._compiled_patterns
+
+    @property
+    def pattern_fingerprints(self):
+        """Group name -> pattern fingerprint, computed on first access"""
+        self._ensure_patterns()
+        return self._pattern_fingerprints
 
     def _load_data(self):
         """Load and parse the JSON file"""
         try:
-            with open(self.json_file, 'r') as f:
-                self.raw_data = json.load(f)
+            self._raw_data, self.json_digest = _load_catalog(self.json_file)
 
             # Extract and process the data
-            extracted = self._extract_name_and_smarts(self.raw_data)
+            extracted = self._extract_name_and_smarts(self._raw_data)
 
             # Create groups_data dictionary
-            self.groups_data = {item['name']: item for item in extracted}
+            self._groups_data = {item['name']: item for item in extracted}
+
+            # Index groups for category, reactivity and text lookups
+            self._build_indexes()
 
             # Create smarts_library dictionary
             smarts_dict = {x["name"]: x["smarts"] for x in extracted}
-            self.smarts_library = dict(sorted(smarts_dict.items()))
-
-            # Compile patterns
-            self.compiled_patterns = self._compile_patterns(
-                self.smarts_library)
+            self._smarts_library = dict(sorted(smarts_dict.items()))
 
         except Exception as e:
+            # Leave the analyzer unloaded so the next lookup retries
+            self._groups_data = None
             print(f"Error loading functional groups data: {e}")
             raise
 
+    def _load_patterns(self):
+        """Compile the SMARTS library, or reuse the patterns cached for this JSON content"""
+        try:
+            cached = self._load_pattern_cache() if self.pattern_cache else None
+            if cached is not None:
+                compiled_patterns, self._pattern_fingerprints = cached
+            else:
+                compiled_patterns = self._compile_patterns(self._smarts_library)
+                self._pattern_fingerprints = self._compute_pattern_fingerprints(
+                    compiled_patterns)
+            self._compiled_patterns = compiled_patterns
+
+            if cached is None and self.pattern_cache:
+                self._save_pattern_cache()
+
+        except Exception as e:
+            print(f"Error compiling functional group patterns: {e}")
+            raise
+
     def _extract_name_and_smarts(self, data):
         """Extract name and SMARTS patterns from linearized JSON data"""
         results = []
@@ -141,28 +283,18 @@ class FunctionalGroupAnalyzer:
         compiled_patterns = {}
         failed_patterns = []
 
-        for name, smarts in smarts_library.items():
-            try:
-                pattern_mol = Chem.MolFromSmarts(smarts)
-                if pattern_mol is not None:
-                    # CRITICAL FIX: Initialize ring information for SMARTS patterns
-                    try:
-                        Chem.FastFindRings(pattern_mol)
-                    except:
-                        try:
-                            # Alternative method if FastFindRings fails
-                            pattern_mol.UpdatePropertyCache(strict=False)
-                            Chem.GetSymmSSSR(pattern_mol)
-                        except Exception as e:
-                            print(
-                                f"Warning: Could not initialize ring info for {name}: {e}")
-
-                    compiled_patterns[name] = pattern_mol
-                else:
-                    failed_patterns.append((name, smarts))
-            except Exception as e:
-                failed_patterns.append((name, smarts))
-                print(f"Failed to compile pattern: {name} -> {e}")
+        if self.n_jobs != 1:
+            results = _compile_patterns_parallel(smarts_library, self.n_jobs)
+        else:
+            results = _compile_pattern_batch(list(smarts_library.items()), as_binary=False)
+
+        for name, pattern_mol, error in results:
+            if pattern_mol is not None:
+                compiled_patterns[name] = pattern_mol
+            else:
+                failed_patterns.append((name, smarts_library[name]))
+                if error:
+                    print(f"Failed to compile pattern: {name} -> {error}")
 
         if failed_patterns:
             print(f"Failed to compile {len(failed_patterns)} patterns")
@@ -174,6 +306,85 @@ class FunctionalGroupAnalyzer:
 
         return compiled_patterns
 
+    def _pattern_cache_path(self):
+        """Return the pickle path of the compiled patterns for the current JSON content"""
+        return f"{self.json_file}.{self.json_digest}.patterns.pkl"
+
+    def _load_pattern_cache(self):
+        """Return cached (compiled_patterns, pattern_fingerprints), or None if unusable"""
+        cache_path = self._pattern_cache_path()
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            # Molecule binaries are only guaranteed to round-trip within one RDKit version
+            if cached.get('rdkit_version') != rdkit.__version__:
+                return None
+            return cached['compiled_patterns'], cached['pattern_fingerprints']
+        except Exception as e:
+            print(f"Warning: Could not read pattern cache {cache_path}: {e}")
+            return None
+
+    def _save_pattern_cache(self):
+        """Write compiled patterns to the pickle cache and drop caches of older JSON content"""
+        cache_path = self._pattern_cache_path()
+        try:
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump({
+                    'rdkit_version': rdkit.__version__,
+                    'compiled_patterns': self.compiled_patterns,
+                    'pattern_fingerprints': self.pattern_fingerprints
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+
+            for stale_path in glob.glob(f"{glob.escape(self.json_file)}.*.patterns.pkl"):
+                if stale_path != cache_path:
+                    os.remove(stale_path)
+        except Exception as e:
+            print(f"Warning: Could not write pattern cache {cache_path}: {e}")
+
+    def _compute_pattern_fingerprints(self, compiled_patterns):
+        """Compute pattern fingerprints used to prescreen patterns before full matching"""
+        fingerprints = {}
+        for name, pattern_mol in compiled_patterns.items():
+            try:
+                fingerprints[name] = Chem.PatternFingerprint(pattern_mol)
+            except Exception as e:
+                # Patterns without a fingerprint are always fully matched
+                print(f"Warning: Could not fingerprint pattern {name}: {e}")
+        return fingerprints
+
+    def _build_indexes(self):
+        """Build inverted indexes used by the category, reactivity and search lookups"""
+        by_category = defaultdict(list)
+        by_reactivity = defaultdict(list)
+        all_categories = set()
+        self._search_tokens = {}
+
+        for name, data in self._groups_data.items():
+            categories = data.get('categories', [])
+            subcategories = data.get('subcategories', [])
+
+            all_categories.update(categories)
+            all_categories.update(subcategories)
+
+            # A group is listed once per category even if it repeats as a subcategory
+            for category in dict.fromkeys(cat.lower() for cat in categories + subcategories):
+                by_category[category].append(name)
+
+            by_reactivity[data.get('reactivity', '').lower()].append(name)
+
+            # Fields are joined with newlines so a search term cannot match across two fields
+            self._search_tokens[name] = '\n'.join(
+                [name, data.get('description', ''), *categories, *subcategories,
+                 *data.get('common_reactions', [])]).lower()
+
+        self._by_category = dict(by_category)
+        self._by_reactivity = dict(by_reactivity)
+        self._all_categories = sorted(all_categories)
+
     def get_groups_data(self):
         """Return the complete groups data dictionary"""
         return self.groups_data
@@ -186,79 +397,123 @@ class FunctionalGroupAnalyzer:
         """Return the compiled patterns dictionary"""
         return self.compiled_patterns
 
+    def get_pattern_fingerprints(self):
+        """Return the pattern fingerprints dictionary"""
+        return self.pattern_fingerprints
+
     def get_group_info(self, group_name):
         """Get detailed information for a specific functional group"""
         return self.groups_data.get(group_name, {})
 
     def get_groups_by_category(self, category):
         """Get all functional groups belonging to a specific category"""
-        matches = []
-        category = category.lower()
-
-        for name, data in self.groups_data.items():
-            categories = [cat.lower() for cat in data.get('categories', [])]
-            subcategories = [subcat.lower()
-                             for subcat in data.get('subcategories', [])]
-
-            if category in categories or category in subcategories:
-                matches.append(name)
-
-        return matches
+        self._ensure_data()
+        return list(self._by_category.get(category.lower(), []))
 
     def get_groups_by_reactivity(self, reactivity):
         """Get all functional groups with a specific reactivity level"""
-        matches = []
-        reactivity = reactivity.lower()
-
-        for name, data in self.groups_data.items():
-            if data.get('reactivity', '').lower() == reactivity:
-                matches.append(name)
-
-        return matches
+        self._ensure_data()
+        return list(self._by_reactivity.get(reactivity.lower(), []))
 
     def get_all_categories(self):
         """Get list of all unique categories"""
-        all_categories = set()
-        for data in self.groups_data.values():
-            all_categories.update(data.get('categories', []))
-            all_categories.update(data.get('subcategories', []))
-        return sorted(list(all_categories))
+        self._ensure_data()
+        return list(self._all_categories)
 
     def search_groups(self, search_term):
         """Search for functional groups by name, description, categories, or reactions"""
-        matches = []
+        self._ensure_data()
         search_term = search_term.lower()
+        return [name for name, tokens in self._search_tokens.items() if search_term in tokens]
 
-        for name, data in self.groups_data.items():
-            # Search in name and description
-            if (search_term in name.lower() or
-                    search_term in data.get('description', '').lower()):
-                matches.append(name)
-                continue
+    def list_all_groups(self):
+        """Return a list of all functional group names"""
+        return list(self.groups_data.keys())
 
-            # Search in categories
-            categories = data.get('categories', [])
-            if any(search_term in cat.lower() for cat in categories):
-                matches.append(name)
-                continue
+    def analyze_molecule_input(self, molecule_input, input_type='smiles'):
+        """Return the matched functional group names for one molecule input ([] if it does not parse)"""
+        try:
+            target_mol = Molecule(molecule_input, input_type=input_type).mol
+            return find_matches_cached(target_mol, self)
+        except Exception as e:
+            print(f"Error analyzing {molecule_input}: {e}")
+            return []
+
+    def analyze_many(self, inputs, input_type='smiles', n_jobs=-1, batch_size=32):
+        """Find functional groups for a list of molecules, returning one list of names per input
+
+        Inputs are split into batches of batch_size and matched in n_jobs worker
+        processes (-1 for all cores). Each worker loads this analyzer's JSON file
+        once, through the pattern cache, instead of receiving the patterns with every
+        batch; starting the workers takes about a second, so n_jobs=1 is faster for
+        short lists. n_jobs=1 or a single batch runs in this process.
+        """
+        inputs = list(inputs)
+        if n_jobs == 1 or len(inputs) <= batch_size:
+            return [self.analyze_molecule_input(item, input_type) for item in inputs]
+
+        batches = [inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size)]
+        results = _map_in_processes(_analyze_batch, batches, n_jobs, input_type,
+                                    self.json_file, self.pattern_cache)
+        return [matches for batch_result in results for matches in batch_result]
+
+
+def _map_in_processes(func, batches, n_jobs, *args):
+    """Run func(batch, *args) for every batch in worker processes and return the results in order"""
+    if Parallel is not None:
+        return Parallel(n_jobs=n_jobs, prefer="processes")(
+            delayed(func)(batch, *args) for batch in batches)
+
+    max_workers = None if n_jobs < 0 else n_jobs
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, batches, *[[arg] * len(batches) for arg in args]))
+
+
+def _compile_pattern(name, smarts):
+    """Compile one SMARTS pattern and initialize its ring info; None if it does not parse"""
+    pattern_mol = Chem.MolFromSmarts(smarts)
+    if pattern_mol is not None:
+        # CRITICAL FIX: Initialize ring information for SMARTS patterns
+        try:
+            Chem.FastFindRings(pattern_mol)
+        except:
+            try:
+                # Alternative method if FastFindRings fails
+                pattern_mol.UpdatePropertyCache(strict=False)
+                Chem.GetSymmSSSR(pattern_mol)
+            except Exception as e:
+                print(
+                    f"Warning: Could not initialize ring info for {name}: {e}")
+    return pattern_mol
 
-            # Search in subcategories
-            subcategories = data.get('subcategories', [])
-            if any(search_term in subcat.lower() for subcat in subcategories):
-                matches.append(name)
-                continue
 
-            # Search in reactions
-            reactions = data.get('common_reactions', [])
-            if any(search_term in reaction.lower() for reaction in reactions):
-                matches.append(name)
-                continue
+def _compile_pattern_batch(items, as_binary=True):
+    """Compile (name, smarts) pairs into (name, pattern or None, error message or None)
 
-        return matches
+    Worker processes return RDKit binaries (as_binary), which keep the ring info.
+    """
+    results = []
+    for name, smarts in items:
+        try:
+            pattern_mol = _compile_pattern(name, smarts)
+        except Exception as e:
+            results.append((name, None, str(e)))
+            continue
+        if as_binary and pattern_mol is not None:
+            pattern_mol = pattern_mol.ToBinary()
+        results.append((name, pattern_mol, None))
+    return results
 
-    def list_all_groups(self):
-        """Return a list of all functional group names"""
-        return list(self.groups_data.keys())
+
+def _compile_patterns_parallel(smarts_library, n_jobs, batch_size=64):
+    """Compile the SMARTS library in worker processes, keeping the library order"""
+    items = list(smarts_library.items())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    results = []
+    for batch_result in _map_in_processes(_compile_pattern_batch, batches, n_jobs):
+        for name, pattern_binary, error in batch_result:
+            results.append((name, Chem.Mol(pattern_binary) if pattern_binary is not None else None, error))
+    return results
 
 
 def safe_add_hs(mol):
@@ -297,47 +552,278 @@ def safe_remove_hs(mol):
         return mol
 
 
-def find_matches(target_mol, compiled_patterns, filter_ring_overlaps=True):
-    """Find matches with proper error handling and ring overlap prevention"""
+def ensure_2d_coords(mol):
+    """Compute 2D coordinates for drawing unless the molecule already has a conformer"""
+    if mol is not None and mol.GetNumConformers() == 0:
+        AllChem.Compute2DCoords(mol)
+    return mol
+
+
+def _ring_info_ready(mol):
+    """Make sure mol can be searched as-is; FastFindRings keeps ring info that is already set"""
+    if mol is None:
+        return False
+    try:
+        Chem.FastFindRings(mol)
+        return True
+    except Exception:
+        return False
+
+
+def _lacks_implicit_hs(mol):
+    """True if Chem.AddHs would only copy mol: no atom carries implicit or explicit-count Hs"""
+    if not _ring_info_ready(mol):
+        return False
+    try:
+        return all(atom.GetTotalNumHs() == 0 for atom in mol.GetAtoms())
+    except RuntimeError:
+        # Property cache not computed (unsanitized input); let safe_add_hs deal with it
+        return False
+
+
+def hydrogen_variants(mol):
+    """Return (with_h, no_h) variants of mol
+
+    Callers build these once per call and share them between patterns; treat the
+    returned molecules as read-only. A variant that would only be a copy (every H
+    already explicit) is mol itself. RemoveHs also sanitizes, which makes the no-H
+    variant the only aromaticity-perceived copy of an unsanitized target, so it is
+    always built.
+    """
+    return (mol if _lacks_implicit_hs(mol) else safe_add_hs(mol)), safe_remove_hs(mol)
+
+
+def _distinct_variants(variants):
+    """Replace variants that repeat an earlier molecule object with None
+
+    hydrogen_variants returns the target itself when a variant would be identical,
+    and searching the same molecule again cannot find anything new.
+    """
+    seen = set()
+    distinct = []
+    for variant in variants:
+        if variant is None or id(variant) in seen:
+            distinct.append(None)
+        else:
+            seen.add(id(variant))
+            distinct.append(variant)
+    return tuple(distinct)
+
+
+# Hydrogen atoms in a few bonding environments, used to test whether a query atom can match H
+_HYDROGEN_PROBE = None
+
+
+def _hydrogen_probe_atoms():
+    """Return hydrogen atoms of a small explicit-H probe molecule (built once)"""
+    global _HYDROGEN_PROBE
+    if _HYDROGEN_PROBE is None:
+        probe = Chem.AddHs(Chem.MolFromSmiles('CNOS[SiH2]P'))
+        Chem.FastFindRings(probe)
+        _HYDROGEN_PROBE = probe
+    return [atom for atom in _HYDROGEN_PROBE.GetAtoms() if atom.GetAtomicNum() == 1]
+
+
+def pattern_needs_explicit_h(pattern_mol):
+    """True if matching pattern_mol against the with-H target variant can change the result
+
+    That is the case when a query atom can match a hydrogen atom ([H], [#1], *, [!C], ...)
+    or the SMARTS uses D or h, whose counts change once hydrogens are explicit. Other
+    patterns see the same heavy-atom graph in the original target. The flag is kept
+    on the pattern object; copies made through ToBinary or the pattern cache recompute it.
+    """
+    needs_h = getattr(pattern_mol, '_fga_needs_h', None)
+    if needs_h is None:
+        try:
+            smarts = Chem.MolToSmarts(pattern_mol)
+            probe_atoms = _hydrogen_probe_atoms()
+            needs_h = (any('D' in primitive or 'h' in primitive
+                           for primitive in re.findall(r'\[[^\]]*\]', smarts))
+                       or any(query_atom.Match(h_atom)
+                              for query_atom in pattern_mol.GetAtoms() for h_atom in probe_atoms))
+        except Exception:
+            # Keep searching every variant when the query cannot be inspected
+            needs_h = True
+        try:
+            pattern_mol._fga_needs_h = needs_h
+        except AttributeError:
+            pass
+    return needs_h
+
+
+def find_matches(target_mol, compiled_patterns, filter_ring_overlaps=True, n_jobs=1,
+                 pattern_fingerprints=None):
+    """Find matches with proper error handling and ring overlap prevention
+
+    Matched names are returned in compiled_patterns order (alphabetical for an
+    analyzer's patterns). n_jobs > 1 (or -1 for all cores) spreads the patterns over
+    worker processes, which pays off for large pattern libraries or expensive targets.
+    pattern_fingerprints (see FunctionalGroupAnalyzer.get_pattern_fingerprints)
+    skips patterns that cannot match before running full substructure searches.
+    """
     matches_keys = []
     matches_with_atoms = []  # Store matches with their atom indices
 
     # Create variants with proper ring info initialization
-    target_with_h = safe_add_hs(target_mol)
-    target_no_h = safe_remove_hs(target_mol)
+    target_with_h, target_no_h = hydrogen_variants(target_mol)
+    target_variants = _distinct_variants((target_mol, target_with_h, target_no_h))
+
+    if pattern_fingerprints:
+        compiled_patterns = _prescreen_patterns(compiled_patterns, pattern_fingerprints, target_variants)
+
+    if n_jobs != 1:
+        matches_with_atoms = _match_patterns_parallel(compiled_patterns, target_variants, n_jobs)
+    else:
+        for pattern_name, pattern_mol in compiled_patterns.items():
+            try:
+                match_atoms = _match_pattern(pattern_mol, target_variants)
+            except Exception as e:
+                print(f"Error matching pattern {pattern_name}: {e}")
+                continue
+
+            if match_atoms:
+                matches_with_atoms.append((pattern_name, match_atoms))
+
+    if filter_ring_overlaps:
+        # Filter out overlapping matches in ring systems, keeping the pattern order
+        filtered_matches = filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms)
+        kept_names = {match[0] for match in filtered_matches}
+        matches_keys = [name for name, _ in matches_with_atoms if name in kept_names]
+    else:
+        matches_keys = [match[0] for match in matches_with_atoms]
+
+    # Matches follow compiled_patterns order, which the analyzer already sorts by name
+    return matches_keys
+
+
+# Number of distinct molecules whose matches find_matches_cached keeps per analyzer
+FIND_MATCHES_CACHE_SIZE = 4096
 
+# Analyzer -> (compiled patterns, memoized matcher) for find_matches_cached; entries
+# go away with their analyzer, so dropped analyzers do not keep their patterns alive
+_find_matches_caches = weakref.WeakKeyDictionary()
+_find_matches_caches_lock = threading.Lock()
+
+
+def _memoized_matcher(compiled_patterns, pattern_fingerprints):
+    """Return the names of the patterns matching a canonical SMILES, memoized
+
+    The ring overlap filter is left out: it depends on atom order, so it is run
+    on the caller's molecule instead.
+    """
+    @lru_cache(maxsize=FIND_MATCHES_CACHE_SIZE)
+    def match(canonical_smiles):
+        target_mol = Molecule(canonical_smiles, input_type='smiles').mol
+        return tuple(find_matches(target_mol, compiled_patterns, filter_ring_overlaps=False,
+                                  pattern_fingerprints=pattern_fingerprints))
+    return match
+
+
+def find_matches_cached(target_mol, analyzer):
+    """find_matches against an analyzer's patterns, memoized on the target's canonical SMILES
+
+    Equivalent spellings of a molecule share the search over the whole library,
+    which is kept for up to FIND_MATCHES_CACHE_SIZE molecules per analyzer and
+    dropped along with it. Only the patterns found there are matched again on
+    target_mol itself, for the ring overlap filter, so the result is the same as
+    find_matches(target_mol, ...) whatever the atom order. SMARTS query targets
+    have no canonical SMILES and are matched directly.
+    """
+    compiled_patterns = analyzer.get_compiled_patterns()
+    pattern_fingerprints = analyzer.get_pattern_fingerprints()
+
+    canonical_smiles = None
+    if not any(atom.HasQuery() for atom in target_mol.GetAtoms()):
+        try:
+            # Work on a copy: writing SMILES updates the property cache of the molecule
+            canonical_smiles = Chem.MolToSmiles(Chem.Mol(target_mol), canonical=True, isomericSmiles=True)
+        except Exception as e:
+            print(f"Warning: Could not canonicalize target, matching without cache: {e}")
+
+    if not canonical_smiles:
+        return find_matches(target_mol, compiled_patterns, pattern_fingerprints=pattern_fingerprints)
+
+    with _find_matches_caches_lock:
+        cached = _find_matches_caches.get(analyzer)
+        if cached is None or cached[0] is not compiled_patterns:
+            cached = (compiled_patterns, _memoized_matcher(compiled_patterns, pattern_fingerprints))
+            _find_matches_caches[analyzer] = cached
+    matched_names = cached[1](canonical_smiles)
+    if len(matched_names) < 2:
+        # The ring overlap filter only ever drops a match in favour of another
+        return list(matched_names)
+    return find_matches(target_mol, {name: compiled_patterns[name] for name in matched_names})
+
+
+def _prescreen_patterns(compiled_patterns, pattern_fingerprints, target_variants):
+    """Keep only patterns whose fingerprint bits are all set in some target variant's fingerprint"""
+    try:
+        target_fps = [Chem.PatternFingerprint(m) for m in target_variants if m is not None]
+    except Exception as e:
+        print(f"Warning: Could not fingerprint target, skipping prescreen: {e}")
+        return compiled_patterns
+
+    candidates = {}
     for pattern_name, pattern_mol in compiled_patterns.items():
-        found_match = False
-        match_atoms = None
+        pattern_fp = pattern_fingerprints.get(pattern_name)
+        if pattern_fp is None or any(DataStructs.AllProbeBitsMatch(pattern_fp, fp) for fp in target_fps):
+            candidates[pattern_name] = pattern_mol
+    return candidates
+
 
+def _match_pattern(pattern_mol, target_variants):
+    """Return the atoms of the first match over original, with-H and no-H targets (or None)"""
+    for index, variant in enumerate(target_variants):
+        if variant is None or (index == 1 and not pattern_needs_explicit_h(pattern_mol)):
+            continue
+        # One search per variant: GetSubstructMatch stops at the first hit and
+        # returns an empty tuple on failure, so HasSubstructMatch is redundant
+        match_atoms = variant.GetSubstructMatch(pattern_mol)
+        if match_atoms:
+            return match_atoms
+    return None
+
+
+def _match_pattern_batch(patterns, target_binaries):
+    """Worker for _match_patterns_parallel: match (name, pattern binary) pairs against the targets
+
+    Molecules travel as RDKit binaries, which keep atom order and ring info intact
+    and give each worker its own copies of the query molecules.
+    """
+    target_variants = [Chem.Mol(b) if b is not None else None for b in target_binaries]
+    results = []
+    for pattern_name, pattern_binary in patterns:
         try:
-            # Try matching against original molecule
-            if target_mol.HasSubstructMatch(pattern_mol):
-                found_match = True
-                match_atoms = target_mol.GetSubstructMatch(pattern_mol)
-            # Try with explicit hydrogens
-            elif target_with_h and target_with_h.HasSubstructMatch(pattern_mol):
-                found_match = True
-                match_atoms = target_with_h.GetSubstructMatch(pattern_mol)
-            # Try without explicit hydrogens
-            elif target_no_h and target_no_h.HasSubstructMatch(pattern_mol):
-                found_match = True
-                match_atoms = target_no_h.GetSubstructMatch(pattern_mol)
+            match_atoms = _match_pattern(Chem.Mol(pattern_binary), target_variants)
         except Exception as e:
             print(f"Error matching pattern {pattern_name}: {e}")
             continue
+        if match_atoms:
+            results.append((pattern_name, match_atoms))
+    return results
 
-        if found_match and match_atoms:
-            matches_with_atoms.append((pattern_name, match_atoms))
 
-    if filter_ring_overlaps:
-        # Filter out overlapping matches in ring systems
-        filtered_matches = filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms)
-        matches_keys = [match[0] for match in filtered_matches]
-    else:
-        matches_keys = [match[0] for match in matches_with_atoms]
+# Analyzers loaded by _analyze_batch, one per JSON file within each worker process
+_worker_analyzers = {}
+
+
+def _analyze_batch(inputs, input_type, json_file, pattern_cache):
+    """Worker for FunctionalGroupAnalyzer.analyze_many: analyze a batch of molecule inputs"""
+    analyzer = _worker_analyzers.get(json_file)
+    if analyzer is None:
+        analyzer = FunctionalGroupAnalyzer(json_file, pattern_cache=pattern_cache)
+        _worker_analyzers[json_file] = analyzer
+    return [analyzer.analyze_molecule_input(item, input_type) for item in inputs]
 
-    return sorted(matches_keys)
+
+def _match_patterns_parallel(compiled_patterns, target_variants, n_jobs, batch_size=64):
+    """Match all patterns in worker processes, returning (name, atoms) in pattern order"""
+    target_binaries = [m.ToBinary() if m is not None else None for m in target_variants]
+    items = [(name, pattern_mol.ToBinary()) for name, pattern_mol in compiled_patterns.items()]
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+    results = _map_in_processes(_match_pattern_batch, batches, n_jobs, target_binaries)
+    return [match for batch_result in results for match in batch_result]
 
 
 def filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms):
@@ -362,28 +848,30 @@ def filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms):
         print(f"Warning: Could not analyze rings for overlap filtering: {e}")
         return matches_with_atoms
     
+    # Ring membership as int bitmasks (bit i = atom i): one mask per ring and one for all ring atoms.
+    # With ints every pairwise subset/shared-ring test below is a single operation; building
+    # numpy membership matrices for all pairs costs more than it saves at these sizes.
+    # The masks are arbitrary-width ints (many targets exceed 64 atoms), which also rules
+    # out an int64 numba/Cython kernel; the whole filter runs well under a millisecond.
+    ring_masks = [_atom_mask(ring) for ring in ring_info.AtomRings()]
+    ring_atom_mask = 0
+    for ring_mask in ring_masks:
+        ring_atom_mask |= ring_mask
+    
     # Group matches by whether they involve ring atoms
     ring_matches = []
     non_ring_matches = []
     
     for pattern_name, match_atoms in matches_with_atoms:
-        # Check if any matched atoms are in rings
-        atoms_in_rings = []
-        atoms_not_in_rings = []
+        # Matched atoms that are in rings, and the rings (bit i = ring i) they touch
+        ring_atom_bits = _atom_mask(match_atoms) & ring_atom_mask
         
-        for atom_idx in match_atoms:
-            if ring_info.IsAtomInRingOfSize(atom_idx, 3) or \
-               ring_info.IsAtomInRingOfSize(atom_idx, 4) or \
-               ring_info.IsAtomInRingOfSize(atom_idx, 5) or \
-               ring_info.IsAtomInRingOfSize(atom_idx, 6) or \
-               ring_info.IsAtomInRingOfSize(atom_idx, 7) or \
-               ring_info.IsAtomInRingOfSize(atom_idx, 8):
-                atoms_in_rings.append(atom_idx)
-            else:
-                atoms_not_in_rings.append(atom_idx)
-        
-        if atoms_in_rings:
-            ring_matches.append((pattern_name, match_atoms, atoms_in_rings, atoms_not_in_rings))
+        if ring_atom_bits:
+            ring_bits = 0
+            for ring_idx, ring_mask in enumerate(ring_masks):
+                if ring_mask & ring_atom_bits:
+                    ring_bits |= 1 << ring_idx
+            ring_matches.append((pattern_name, match_atoms, ring_atom_bits, ring_bits))
         else:
             non_ring_matches.append((pattern_name, match_atoms))
     
@@ -393,21 +881,20 @@ def filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms):
     # Sort ring matches by size (larger patterns first to keep more specific matches)
     ring_matches.sort(key=lambda x: len(x[1]), reverse=True)
     
-    for i, (pattern_name, match_atoms, ring_atoms, non_ring_atoms) in enumerate(ring_matches):
+    for pattern_name, match_atoms, ring_atom_bits, ring_bits in ring_matches:
         is_subpattern = False
         
         # Check if this pattern is a substructure of a larger already-accepted pattern
-        for accepted_name, accepted_atoms, accepted_ring_atoms, accepted_non_ring_atoms in filtered_ring_matches:
+        for accepted_name, _, accepted_ring_atom_bits, accepted_ring_bits in filtered_ring_matches:
             # If all ring atoms of current pattern are contained in accepted pattern's ring atoms
-            if set(ring_atoms).issubset(set(accepted_ring_atoms)):
-                # And the patterns share the same ring system
-                if _patterns_share_ring_system(target_mol, ring_atoms, accepted_ring_atoms, ring_info):
-                    is_subpattern = True
-                    print(f"  Filtering out '{pattern_name}' as it overlaps with '{accepted_name}' in ring system")
-                    break
+            # and the patterns share the same ring system
+            if not ring_atom_bits & ~accepted_ring_atom_bits and ring_bits & accepted_ring_bits:
+                is_subpattern = True
+                print(f"  Filtering out '{pattern_name}' as it overlaps with '{accepted_name}' in ring system")
+                break
         
         if not is_subpattern:
-            filtered_ring_matches.append((pattern_name, match_atoms, ring_atoms, non_ring_atoms))
+            filtered_ring_matches.append((pattern_name, match_atoms, ring_atom_bits, ring_bits))
     
     # Combine filtered ring matches with non-ring matches
     final_matches = []
@@ -423,34 +910,12 @@ def filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms):
     return final_matches
 
 
-def _patterns_share_ring_system(mol, atoms1, atoms2, ring_info):
-    """
-    Check if two sets of atoms share the same ring system.
-    
-    Args:
-        mol: The molecule
-        atoms1: First set of atom indices
-        atoms2: Second set of atom indices
-        ring_info: Ring information from the molecule
-        
-    Returns:
-        True if the atom sets share a ring system
-    """
-    # Get all rings that contain atoms from each set
-    rings1 = set()
-    rings2 = set()
-    
-    for ring_idx in range(ring_info.NumRings()):
-        ring_atoms = set(ring_info.AtomRings()[ring_idx])
-        
-        if any(atom in ring_atoms for atom in atoms1):
-            rings1.add(ring_idx)
-        
-        if any(atom in ring_atoms for atom in atoms2):
-            rings2.add(ring_idx)
-    
-    # If they share any rings, they're in the same ring system
-    return len(rings1.intersection(rings2)) > 0
+def _atom_mask(atom_indices):
+    """Encode atom indices as an int bitmask with bit i set for atom i"""
+    mask = 0
+    for atom_idx in atom_indices:
+        mask |= 1 << atom_idx
+    return mask
 
 
 def generate_colors(num_colors):
@@ -509,22 +974,45 @@ def create_atom_mapping(source_mol, display_mol):
     return mapping
 
 
-def get_substructure_matches(target_mol, pattern_mol):
-    """Get substructure matches with proper error handling"""
-    target_with_h = safe_add_hs(target_mol)
-    target_no_h = safe_remove_hs(target_mol)
+def _bonds_within_atoms(mol, atom_indices):
+    """Return indices of bonds joining two of the given atoms
+
+    Only bonds incident to those atoms are scanned, instead of probing every atom pair.
+    """
+    atom_set = set(atom_indices)
+    bond_indices = []
+    for atom_idx in atom_set:
+        for bond in mol.GetAtomWithIdx(atom_idx).GetBonds():
+            other_idx = bond.GetOtherAtomIdx(atom_idx)
+            if other_idx in atom_set and other_idx > atom_idx:
+                bond_indices.append(bond.GetIdx())
+    return bond_indices
+
+
+# Upper bound on matches collected per pattern for highlighting; symmetric or
+# repetitive molecules can otherwise enumerate a very large number of embeddings
+MAX_HIGHLIGHT_MATCHES = 100
+
 
-    test_molecules = [
-        (target_mol, "original"),
-        (target_no_h, "no_h"),
-        (target_with_h, "with_h")
-    ]
+def _prepare_target_variants(target_mol):
+    """Return the (molecule, type) pairs searched for highlights, in search order
 
-    for mol, mol_type in test_molecules:
-        if mol is None:
+    Visualizations build these once per target and match every pattern against them.
+    """
+    target_with_h, target_no_h = hydrogen_variants(target_mol)
+    variants = zip(_distinct_variants((target_mol, target_no_h, target_with_h)),
+                   ("original", "no_h", "with_h"))
+    return [(mol, mol_type) for mol, mol_type in variants if mol is not None]
+
+
+def _match_prepared(target_variants, pattern_mol):
+    """Return (matches, source molecule) from the first variant the pattern matches"""
+    needs_h = pattern_needs_explicit_h(pattern_mol)
+    for mol, mol_type in target_variants:
+        if mol_type == "with_h" and not needs_h:
             continue
         try:
-            temp_matches = mol.GetSubstructMatches(pattern_mol)
+            temp_matches = mol.GetSubstructMatches(pattern_mol, maxMatches=MAX_HIGHLIGHT_MATCHES)
             if temp_matches:
                 return temp_matches, mol
         except Exception as e:
@@ -534,13 +1022,38 @@ def get_substructure_matches(target_mol, pattern_mol):
     return [], None
 
 
-def visualize_matches(target_mol, compiled_patterns, matches_keys, img_size=(400, 400)):
-    """Visualize matches with proper error handling"""
+def get_substructure_matches(target_mol, pattern_mol):
+    """Get substructure matches with proper error handling"""
+    return _match_prepared(_prepare_target_variants(target_mol), pattern_mol)
+
+
+def _atom_mapping_for(source_mol, display_mol, atom_mappings):
+    """create_atom_mapping, memoized in atom_mappings across the patterns of one target"""
+    atom_mapping = atom_mappings.get(id(source_mol))
+    if atom_mapping is None:
+        atom_mapping = create_atom_mapping(source_mol, display_mol)
+        atom_mappings[id(source_mol)] = atom_mapping
+    return atom_mapping
+
+
+def _in_notebook():
+    """True when running inside a Jupyter kernel, where SVG can be displayed directly"""
+    return get_ipython is not None and getattr(get_ipython(), 'kernel', None) is not None
+
+
+def visualize_matches(target_mol, compiled_patterns, matches_keys, img_size=(400, 400),
+                      image_format='png'):
+    """Visualize matches with proper error handling
+
+    Returns a PIL image for image_format='png'. image_format='svg' draws with
+    MolDraw2DSVG and returns an IPython SVG object (the SVG text without IPython),
+    which notebooks display as-is, with no PNG decode and no matplotlib resampling.
+    """
     if not matches_keys:
         print("No matches to visualize")
         return None
 
-    display_mol = safe_remove_hs(target_mol)
+    display_mol = ensure_2d_coords(safe_remove_hs(target_mol))
     if display_mol is None:
         print("Could not create display molecule")
         return None
@@ -552,17 +1065,21 @@ def visualize_matches(target_mol, compiled_patterns, matches_keys, img_size=(400
 
     colors = generate_colors(len(matches_keys))
 
+    # Target variants and atom mappings are shared by all patterns
+    target_variants = _prepare_target_variants(target_mol)
+    atom_mappings = {}
+
     # print("Highlighting substructures:")
     for i, pattern_name in enumerate(matches_keys):
         pattern_mol = compiled_patterns[pattern_name]
         color = colors[i]
 
-        matches, source_mol = get_substructure_matches(target_mol, pattern_mol)
+        matches, source_mol = _match_prepared(target_variants, pattern_mol)
 
         if not matches or source_mol is None:
             continue
 
-        atom_mapping = create_atom_mapping(source_mol, display_mol)
+        atom_mapping = _atom_mapping_for(source_mol, display_mol, atom_mappings)
 
         # print(f"  - {pattern_name}: {len(matches)} instance(s)")
 
@@ -579,18 +1096,16 @@ def visualize_matches(target_mol, compiled_patterns, matches_keys, img_size=(400
                         if display_atom_idx not in atom_colors:
                             atom_colors[display_atom_idx] = color
 
-            for j, atom1_idx in enumerate(matched_display_atoms):
-                for atom2_idx in matched_display_atoms[j+1:]:
-                    bond = display_mol.GetBondBetweenAtoms(
-                        atom1_idx, atom2_idx)
-                    if bond is not None:
-                        bond_idx = bond.GetIdx()
-                        all_highlight_bonds.add(bond_idx)
-                        if bond_idx not in bond_colors:
-                            bond_colors[bond_idx] = color
+            for bond_idx in _bonds_within_atoms(display_mol, matched_display_atoms):
+                all_highlight_bonds.add(bond_idx)
+                if bond_idx not in bond_colors:
+                    bond_colors[bond_idx] = color
 
     try:
-        drawer = rdMolDraw2D.MolDraw2DCairo(img_size[0], img_size[1])
+        if image_format == 'svg':
+            drawer = rdMolDraw2D.MolDraw2DSVG(img_size[0], img_size[1])
+        else:
+            drawer = rdMolDraw2D.MolDraw2DCairo(img_size[0], img_size[1])
         drawer.DrawMolecule(display_mol,
                             highlightAtoms=list(all_highlight_atoms),
                             highlightAtomColors=atom_colors,
@@ -599,6 +1114,9 @@ def visualize_matches(target_mol, compiled_patterns, matches_keys, img_size=(400
         drawer.FinishDrawing()
 
         img_data = drawer.GetDrawingText()
+        if image_format == 'svg':
+            svg = img_data.replace('svg:', '')
+            return SVG(svg) if get_ipython is not None else svg
         return Image.open(io.BytesIO(img_data))
     except Exception as e:
         print(f"Error creating visualization: {e}")
@@ -611,7 +1129,7 @@ def show_individual_matches(target_mol, compiled_patterns, matches_keys, img_siz
         print("No matches to show individually")
         return
 
-    display_mol = safe_remove_hs(target_mol)
+    display_mol = ensure_2d_coords(safe_remove_hs(target_mol))
     if display_mol is None:
         print("Could not create display molecule")
         return
@@ -630,16 +1148,20 @@ def show_individual_matches(target_mol, compiled_patterns, matches_keys, img_siz
     else:
         axes = axes.flatten()
 
+    # Target variants and atom mappings are shared by all patterns
+    target_variants = _prepare_target_variants(target_mol)
+    atom_mappings = {}
+
     for i, pattern_name in enumerate(matches_keys):
         pattern_mol = compiled_patterns[pattern_name]
         color = colors[i]
 
-        matches, source_mol = get_substructure_matches(target_mol, pattern_mol)
+        matches, source_mol = _match_prepared(target_variants, pattern_mol)
 
         if not matches or source_mol is None:
             continue
 
-        atom_mapping = create_atom_mapping(source_mol, display_mol)
+        atom_mapping = _atom_mapping_for(source_mol, display_mol, atom_mappings)
 
         highlight_atoms = set()
         highlight_bonds = set()
@@ -657,14 +1179,9 @@ def show_individual_matches(target_mol, compiled_patterns, matches_keys, img_siz
                         highlight_atoms.add(display_atom_idx)
                         atom_colors[display_atom_idx] = color
 
-            for j, atom1_idx in enumerate(matched_display_atoms):
-                for atom2_idx in matched_display_atoms[j+1:]:
-                    bond = display_mol.GetBondBetweenAtoms(
-                        atom1_idx, atom2_idx)
-                    if bond is not None:
-                        bond_idx = bond.GetIdx()
-                        highlight_bonds.add(bond_idx)
-                        bond_colors[bond_idx] = color
+            for bond_idx in _bonds_within_atoms(display_mol, matched_display_atoms):
+                highlight_bonds.add(bond_idx)
+                bond_colors[bond_idx] = color
 
         try:
             drawer = rdMolDraw2D.MolDraw2DCairo(img_size[0], img_size[1])
@@ -746,7 +1263,7 @@ def main(target_input, show_detailed=False, show_visualizations=True, analyzer=N
         target_input: SMILES string, molecule file path, or SMARTS pattern
         show_detailed: Whether to display detailed CHEBI information for matches
         show_visualizations: Whether to show molecular visualizations
-        analyzer: Optional FunctionalGroupAnalyzer instance, will create new one if not provided
+        analyzer: Optional FunctionalGroupAnalyzer instance, the shared default analyzer is used if not provided
 
     Returns:
         matches_keys: list of matched functional group names
@@ -755,21 +1272,21 @@ def main(target_input, show_detailed=False, show_visualizations=True, analyzer=N
     if analyzer is None:
         json_file = "functional_group_with_chebi_updated.json"
         try:
-            analyzer = FunctionalGroupAnalyzer(json_file)
+            analyzer = _shared_analyzer(json_file)
         except Exception as e:
             print(f"Error loading functional groups data: {e}")
             return
 
     try:
-        mol_obj = Molecule(target_input, input_type='auto')
+        mol_obj = Molecule(target_input, input_type='auto',
+                           compute_coords=show_visualizations)
         target_mol = mol_obj.mol
     except Exception as e:
         print(f"Error creating molecule: {e}")
         return
 
     try:
-        matches_keys = find_matches(
-            target_mol, analyzer.get_compiled_patterns())
+        matches_keys = find_matches_cached(target_mol, analyzer)
     except Exception as e:
         print(f"Error finding matches: {e}")
         return
@@ -783,14 +1300,22 @@ def main(target_input, show_detailed=False, show_visualizations=True, analyzer=N
             display_detailed_matches(matches_keys, analyzer.get_groups_data())
 
         if show_visualizations:
-            img = visualize_matches(
-                target_mol, analyzer.get_compiled_patterns(), matches_keys)
-            if img:
-                plt.figure(figsize=(8, 8))
-                plt.imshow(img)
-                plt.title("Molecule with All Matching Substructures Highlighted")
-                plt.axis('off')
-                plt.show()
+            if _in_notebook():
+                # SVG goes straight to the notebook, at the size of the matplotlib figure
+                svg = visualize_matches(target_mol, analyzer.get_compiled_patterns(), matches_keys,
+                                        img_size=(800, 800), image_format='svg')
+                if svg:
+                    print("Molecule with All Matching Substructures Highlighted")
+                    display(svg)
+            else:
+                img = visualize_matches(
+                    target_mol, analyzer.get_compiled_patterns(), matches_keys)
+                if img:
+                    plt.figure(figsize=(8, 8))
+                    plt.imshow(img)
+                    plt.title("Molecule with All Matching Substructures Highlighted")
+                    plt.axis('off')
+                    plt.show()
 
             print("\n=== Individual Pattern Matches ===")
             show_individual_matches(
@@ -822,49 +1347,836 @@ def text_only_analysis(input_molecule, analyzer=None):
     return main(input_molecule, show_detailed=True, show_visualizations=False, analyzer=analyzer)
 
 
+def analyze_many(inputs, input_type='smiles', n_jobs=-1, analyzer=None):
+    """Find functional groups for many molecules, e.g. a screening list of SMILES"""
+    if analyzer is None:
+        analyzer = _shared_analyzer()
+    return analyzer.analyze_many(inputs, input_type=input_type, n_jobs=n_jobs)
+
+
+# Absolute JSON path -> (analyzer, catalog stamp it was loaded at), shared by the
+# convenience functions; _refreshing holds the paths being reloaded in the background
+_shared_analyzers = {}
+_refreshing = set()
+_shared_lock = threading.Lock()
+
+
+def _refresh_shared_analyzer(json_file, stamp, stale):
+    """Load json_file into a new analyzer and swap it in for the stale one"""
+    try:
+        analyzer = FunctionalGroupAnalyzer(json_file)
+        analyzer.get_groups_data()
+        # Only pay for pattern compilation if the stale analyzer was using patterns
+        if stale._compiled_patterns is not None:
+            analyzer.get_compiled_patterns()
+        with _shared_lock:
+            # An edit in this process may have dropped the stale analyzer meanwhile,
+            # and its replacement must not be swapped for one loaded before the edit
+            if _shared_analyzers.get(json_file, (None,))[0] is stale:
+                _shared_analyzers[json_file] = (analyzer, stamp)
+    except Exception as e:
+        print(f"Warning: Could not refresh functional groups from {json_file}: {e}")
+    finally:
+        with _shared_lock:
+            _refreshing.discard(json_file)
+
+
+def _forget_shared_analyzer(json_file):
+    """Drop the shared analyzer for json_file so the next call loads the edited catalog"""
+    with _shared_lock:
+        _shared_analyzers.pop(os.path.abspath(json_file), None)
+
+
+def _shared_analyzer(json_file="functional_group_with_chebi_updated.json"):
+    """Return the analyzer shared by the convenience functions
+
+    When the catalog has changed on disk since the analyzer was loaded, the stale
+    analyzer is returned straight away and a background thread loads the new
+    catalog and swaps it in, so a query never waits for a reload. Edits made
+    through this module drop the shared analyzer instead, so the process that
+    made them sees them on its next call.
+    """
+    json_file = os.path.abspath(json_file)
+    stamp = _catalog_stamp(json_file)
+    with _shared_lock:
+        cached = _shared_analyzers.get(json_file)
+        if cached is None:
+            # Construction is cheap; the catalog is parsed on the first lookup
+            analyzer = FunctionalGroupAnalyzer(json_file)
+            _shared_analyzers[json_file] = (analyzer, stamp)
+            return analyzer
+
+        analyzer, loaded_stamp = cached
+        if stamp != loaded_stamp and json_file not in _refreshing:
+            _refreshing.add(json_file)
+            threading.Thread(target=_refresh_shared_analyzer,
+                             args=(json_file, stamp, analyzer), daemon=True).start()
+    return analyzer
+
+
 def create_analyzer(json_file="functional_group_with_chebi_updated.json"):
-    """Create a FunctionalGroupAnalyzer instance"""
-    return FunctionalGroupAnalyzer(json_file)
+    """Create a FunctionalGroupAnalyzer instance
+
+    Repeated calls for an unchanged file return the same (shared) analyzer.
+    """
+    return _shared_analyzer(json_file)
 
 
 def search_functional_groups(search_term, analyzer=None):
     """Search for functional groups by name or description"""
     if analyzer is None:
-        analyzer = FunctionalGroupAnalyzer()
+        analyzer = _shared_analyzer()
     return analyzer.search_groups(search_term)
 
 
 def list_all_functional_groups(analyzer=None):
     """List all available functional group names"""
     if analyzer is None:
-        analyzer = FunctionalGroupAnalyzer()
+        analyzer = _shared_analyzer()
     return analyzer.list_all_groups()
 
 
 def search_by_category(category, analyzer=None):
     """Search for functional groups by category"""
     if analyzer is None:
-        analyzer = FunctionalGroupAnalyzer()
+        analyzer = _shared_analyzer()
     return analyzer.get_groups_by_category(category)
 
 
 def search_by_reactivity(reactivity, analyzer=None):
     """Search for functional groups by reactivity level"""
     if analyzer is None:
-        analyzer = FunctionalGroupAnalyzer()
+        analyzer = _shared_analyzer()
     return analyzer.get_groups_by_reactivity(reactivity)
 
 
 def get_all_categories(analyzer=None):
     """Get all available categories"""
     if analyzer is None:
-        analyzer = FunctionalGroupAnalyzer()
+        analyzer = _shared_analyzer()
     return analyzer.get_all_categories()
 
 
+def list_all_functional_groups_streaming(json_file="functional_group_with_chebi_updated.json"):
+    """Yield functional group names as list_all_functional_groups returns them
+
+    The catalog is streamed with ijson instead of loaded into an analyzer, so
+    memory use is bounded by the set of names seen rather than the whole catalog.
+    """
+    seen = set()
+    for group in _stream_catalog_groups(json_file):
+        name = group.get('name', '')
+        if name and group.get('smarts', '') and name not in seen:
+            seen.add(name)
+            yield name
+
+
+def get_all_categories_streaming(json_file="functional_group_with_chebi_updated.json"):
+    """Return the sorted categories and subcategories, streaming the catalog with ijson"""
+    all_categories = set()
+    for group in _stream_catalog_groups(json_file):
+        if group.get('name', '') and group.get('smarts', ''):
+            all_categories.update(group.get('categories', []))
+            all_categories.update(group.get('subcategories', []))
+    return sorted(all_categories)
+
+
+@contextmanager
+def _mapped_catalog(json_file):
+    """Yield a read-only buffer over the bytes of json_file
+
+    The file is memory-mapped, so parsing it needs no in-memory copy of the whole
+    file; the mapping is closed when the block exits. Empty files cannot be mapped
+    and are yielded as b''.
+    """
+    with open(json_file, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            mm = None
+        if mm is None:
+            yield b''
+            return
+        with mm, memoryview(mm) as buf:
+            yield buf
+
+
+# Size past which the append log is folded back into the JSON file
+CATALOG_LOG_MAX_BYTES = 1 << 20
+
+# Leading columns of the columnar functional_groups table; keys outside this list
+# get extra columns after them
+CATALOG_COLUMNS = ['id', 'name', 'smarts', 'description', 'categories', 'subcategories',
+                   'examples', 'chebi_id', 'chebi_description', 'reactivity',
+                   'common_reactions']
+
+# Columns holding a few distinct strings, stored as indices into a list of levels
+CATALOG_CODED_COLUMNS = ['reactivity']
+
+
+def _groups_to_columns(groups):
+    """Return functional groups as a {'columns': [...], 'codes': {...}, 'rows': [[...], ...]} table
+
+    Every key is stored once in columns instead of once per group. A missing key is
+    a null cell and trailing nulls are dropped, so None values do not round-trip.
+    Cells of CATALOG_CODED_COLUMNS are stored as integer indices into codes[column]
+    when every value in the column is a string.
+    """
+    columns = list(CATALOG_COLUMNS)
+    positions = {key: i for i, key in enumerate(columns)}
+    rows = []
+    for group in groups:
+        row = [None] * len(columns)
+        for key, value in group.items():
+            i = positions.get(key)
+            if i is None:
+                i = positions[key] = len(columns)
+                columns.append(key)
+                row.append(None)
+            row[i] = value
+        rows.append(row)
+
+    codes = {}
+    for key in CATALOG_CODED_COLUMNS:
+        i = positions[key]
+        cells = [row[i] for row in rows if i < len(row) and row[i] is not None]
+        if not all(isinstance(value, str) for value in cells):
+            continue
+        levels = sorted(set(cells))
+        level_codes = {level: code for code, level in enumerate(levels)}
+        for row in rows:
+            if i < len(row) and row[i] is not None:
+                row[i] = level_codes[row[i]]
+        codes[key] = levels
+
+    for row in rows:
+        while row and row[-1] is None:
+            row.pop()
+    return {'columns': columns, 'codes': codes, 'rows': rows}
+
+
+def _columns_row_reader(columns, codes):
+    """Return a function that turns one row of a columnar table back into a group dict"""
+    coded = [(columns.index(key), levels) for key, levels in codes.items()]
+
+    def read_row(row):
+        for i, levels in coded:
+            if i < len(row) and row[i] is not None:
+                row[i] = levels[row[i]]
+        return {key: value for key, value in zip(columns, row) if value is not None}
+
+    return read_row
+
+
+def _expand_columns(data):
+    """Turn a columnar functional_groups table back into a list of dicts, in place
+
+    Catalogs that still store one dict per group are returned unchanged.
+    """
+    table = data.get('functional_groups')
+    if isinstance(table, dict):
+        read_row = _columns_row_reader(table['columns'], table.get('codes', {}))
+        data['functional_groups'] = [read_row(row) for row in table['rows']]
+    return data
+
+
+# Per-thread map of catalogs whose lock this thread holds to whether it holds it
+# exclusively, so nested calls reuse it
+_catalog_locks_held = threading.local()
+
+
+@contextmanager
+def _catalog_lock(json_file, exclusive=True):
+    """Hold a lock on json_file + '.lock' for the duration of the block
+
+    Writers take it exclusively and readers shared, so no reader sees the JSON and
+    its append log half-way through an edit and concurrent processes cannot
+    interleave their read-modify-writes. A lock file is used because the JSON
+    itself is replaced on every rewrite. A thread that already holds the lock
+    exclusively, or shared when shared is asked for, does not take it again.
+    Asking for it exclusively while holding it shared, such as editing the
+    catalog while iterating _stream_catalog_groups, raises RuntimeError: flock
+    cannot upgrade atomically and two upgrading processes would deadlock. Without
+    fcntl, or if the lock file cannot be created (a read-only directory that
+    nobody can edit), no lock is taken.
+    """
+    held = getattr(_catalog_locks_held, 'modes', None)
+    if held is None:
+        held = _catalog_locks_held.modes = {}
+    key = os.path.abspath(json_file)
+    if key in held:
+        if exclusive and not held[key]:
+            raise RuntimeError(f"Cannot edit catalog '{json_file}' while reading it")
+        yield
+        return
+    if fcntl is None:
+        yield
+        return
+
+    try:
+        lock_file = open(f"{json_file}.lock", 'ab')
+    except OSError:
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        held[key] = exclusive
+        try:
+            yield
+        finally:
+            del held[key]
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _catalog_log_path(json_file):
+    """Return the JSON Lines log that single adds and removes are appended to"""
+    return f"{json_file}.jsonl"
+
+
+def _file_stamp(path):
+    """Return (size, mtime in ns) of path, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _catalog_stamp(json_file):
+    """Return the stamps of json_file and its append log, to detect edits on disk
+
+    Sizes are part of the stamp because an append can land within the same mtime
+    tick as the previous write, and the stamps are compared for equality rather
+    than order so that a deleted log or a restored older JSON also count as edits.
+    Raises FileNotFoundError if json_file itself does not exist.
+    """
+    stamp = _file_stamp(json_file)
+    if stamp is None:
+        raise FileNotFoundError(f"No such catalog: '{json_file}'")
+    return stamp, _file_stamp(_catalog_log_path(json_file))
+
+
+def _read_catalog_log(json_file):
+    """Return the bytes of json_file's append log, or b'' if there is none"""
+    try:
+        with open(_catalog_log_path(json_file), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+
+def _parse_catalog_log(log_bytes):
+    """Split an append log into (added, tombstones)
+
+    Each line is either a group to add or {"_tombstone": name}, which drops every
+    group of that name added before it; the {"_log": id} header is skipped. added lists (position, group) in log order
+    and tombstones maps each removed name to the position of its last tombstone, so
+    a group added at position p survives unless tombstones.get(name, -1) > p, and a
+    group from the JSON survives unless its name is in tombstones. A last line
+    without a newline is an interrupted append and is ignored.
+    """
+    added = []
+    tombstones = {}
+    loads = orjson.loads if orjson is not None else json.loads
+    for position, line in enumerate(log_bytes.split(b'\n')[:-1]):
+        if not line.strip():
+            continue
+        record = loads(line)
+        if '_log' in record:
+            continue
+        if '_tombstone' in record:
+            tombstones[record['_tombstone']] = position
+        else:
+            added.append((position, record))
+    return added, tombstones
+
+
+def _catalog_log_id(log_bytes):
+    """Return the id in the {"_log": id} header of an append log, or None"""
+    loads = orjson.loads if orjson is not None else json.loads
+    try:
+        header = loads(log_bytes.split(b'\n', 1)[0])
+    except ValueError:
+        return None
+    return header.get('_log') if isinstance(header, dict) else None
+
+
+def _unfolded_log(metadata, log_bytes):
+    """Return the part of an append log that is not folded into the catalog yet
+
+    Every log starts with a {"_log": id} header, and folding a log into the JSON
+    records its id and size in metadata['folded_log']. If a crash left the log
+    behind after the JSON was written, that prefix is skipped rather than applied
+    a second time; anything appended after it still is.
+    """
+    folded = metadata.get('folded_log')
+    if folded and len(log_bytes) >= folded['size'] and _catalog_log_id(log_bytes) == folded['id']:
+        return log_bytes[folded['size']:]
+    return log_bytes
+
+
+def _replay_catalog_log(data, log_bytes):
+    """Apply the records of an append log to a parsed catalog, in place
+
+    All tombstones are applied in one pass over the groups. Added groups get fg_###
+    IDs from the metadata counter in log order, including ones removed again later
+    in the log, so every reader assigns the same IDs. The counter is seeded before
+    any group is dropped, so the IDs do not depend on what the log removes, and
+    metadata['total_groups'] is updated to the replayed count.
+    """
+    added, tombstones = _parse_catalog_log(_unfolded_log(data['metadata'], log_bytes))
+    if not added and not tombstones:
+        return data
+
+    _seed_group_ids(data)
+    groups = data['functional_groups']
+    if tombstones:
+        groups = [group for group in groups if group.get('name') not in tombstones]
+    for position, record in added:
+        if 'id' not in record:
+            record = {'id': _next_group_id(data), **record}
+        if tombstones.get(record.get('name'), -1) < position:
+            groups.append(record)
+    data['functional_groups'] = groups
+    data['metadata']['total_groups'] = len(groups)
+    return data
+
+
+def _append_catalog_log(json_file, records):
+    """Append records to json_file's log as JSON Lines with a single write
+
+    Raises FileNotFoundError if json_file itself does not exist.
+    """
+    if not os.path.exists(json_file):
+        raise FileNotFoundError(f"No such catalog: '{json_file}'")
+    if orjson is not None:
+        payload = b''.join(orjson.dumps(record) + b'\n' for record in records)
+    else:
+        payload = ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                          for record in records).encode('utf-8')
+    log_path = _catalog_log_path(json_file)
+    with _catalog_lock(json_file):
+        with open(log_path, 'ab') as f:
+            if f.tell() == 0:
+                # A new log gets an id, so a fold can tell this log from later ones
+                header = {'_log': uuid.uuid4().hex}
+                payload = (orjson.dumps(header) if orjson is not None
+                           else json.dumps(header, separators=(',', ':')).encode('utf-8')) + b'\n' + payload
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        _forget_shared_analyzer(json_file)
+
+        # Fold a long log back into the JSON so loads do not keep replaying it
+        if os.path.getsize(log_path) > CATALOG_LOG_MAX_BYTES:
+            compact_catalog(json_file)
+
+
+def _read_catalog(json_file):
+    """Load a functional group catalog, parsing with orjson when available"""
+    with _catalog_lock(json_file, exclusive=False):
+        if orjson is not None:
+            # orjson parses the catalog several times faster than json, straight
+            # from the mapped file
+            with _mapped_catalog(json_file) as buf:
+                data = _expand_columns(orjson.loads(buf))
+        else:
+            with open(json_file, 'rb') as f:
+                data = _expand_columns(json.load(f))
+        return _replay_catalog_log(data, _read_catalog_log(json_file))
+
+
+def _stream_catalog_groups(json_file):
+    """Yield the groups of a catalog one at a time without loading the whole file
+
+    The JSON is parsed incrementally with ijson, in either the list or the columnar
+    layout, and the append log is applied on the way. Groups added through the log
+    are yielded last and, unlike _read_catalog, without an fg_### ID. The catalog
+    lock is held in shared mode until the generator is exhausted or closed. Without
+    ijson the catalog is read in full with _read_catalog.
+    """
+    if ijson is None:
+        yield from _read_catalog(json_file)['functional_groups']
+        return
+
+    with _catalog_lock(json_file, exclusive=False):
+        with open(json_file, 'rb') as f:
+            # _write_catalog puts metadata first, so its folded_log marker is read
+            # on the way to the groups
+            layout = None
+            folded = {}
+            for prefix, event, value in ijson.parse(f):
+                if prefix == 'functional_groups':
+                    layout = event
+                    break
+                if prefix in ('metadata.folded_log.id', 'metadata.folded_log.size'):
+                    folded[prefix.rsplit('.', 1)[1]] = value
+
+            # The log is small enough to read up front
+            log_bytes = _unfolded_log({'folded_log': folded or None}, _read_catalog_log(json_file))
+            added, tombstones = _parse_catalog_log(log_bytes)
+
+            if layout == 'start_array':
+                f.seek(0)
+                groups = ijson.items(f, 'functional_groups.item', use_float=True)
+            elif layout == 'start_map':
+                f.seek(0)
+                columns = next(ijson.items(f, 'functional_groups.columns'))
+                f.seek(0)
+                codes = next(ijson.items(f, 'functional_groups.codes'), {})
+                read_row = _columns_row_reader(columns, codes)
+                f.seek(0)
+                groups = (read_row(row) for row in
+                          ijson.items(f, 'functional_groups.rows.item', use_float=True))
+            else:
+                groups = ()
+
+            for group in groups:
+                if group.get('name') not in tombstones:
+                    yield group
+        for position, group in added:
+            if tombstones.get(group.get('name'), -1) < position:
+                yield group
+
+
+def _parse_catalog(json_file):
+    """Parse json_file, without its append log, and return (data, digest of the JSON)"""
+    with _mapped_catalog(json_file) as buf:
+        digest = hashlib.sha1(buf).hexdigest()[:16]
+        data = orjson.loads(buf) if orjson is not None else json.loads(bytes(buf))
+    return _expand_columns(data), digest
+
+
+def _cached_catalog_json(json_file, stamp):
+    """Return (data, digest) of json_file without its append log, via its pickle cache
+
+    The cache is json_file + '.pkl' and records the _file_stamp of the JSON it was
+    built from; it is only used while that stamp still equals stamp. A missing or
+    stale cache is rewritten from the JSON. The caller holds the catalog lock.
+    """
+    cache_path = f"{json_file}.pkl"
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('stamp') == stamp:
+            return cached['data'], cached['digest']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not read catalog cache {cache_path}: {e}")
+
+    data, digest = _parse_catalog(json_file)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'stamp': stamp, 'digest': digest, 'data': data}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write catalog cache {cache_path}: {e}")
+    return data, digest
+
+
+def _load_catalog(json_file):
+    """Return (data, digest) for json_file with its append log applied
+
+    The parsed JSON comes from its pickle cache when that is current (see
+    _cached_catalog_json) and the log is replayed on top on every load, so an edit
+    made through the log does not invalidate the cache. The digest covers the JSON
+    and the log, so it changes with every edit.
+    """
+    # Shared lock: no edit lands between reading the catalog and caching it
+    with _catalog_lock(json_file, exclusive=False):
+        stamp = _file_stamp(json_file)
+        if stamp is None:
+            raise FileNotFoundError(f"No such catalog: '{json_file}'")
+        data, digest = _cached_catalog_json(json_file, stamp)
+        log_bytes = _read_catalog_log(json_file)
+
+    if log_bytes:
+        digest = hashlib.sha1(digest.encode('ascii') + log_bytes).hexdigest()[:16]
+        data = _replay_catalog_log(data, log_bytes)
+    return data, digest
+
+
+# Absolute JSON path -> (JSON stamp, group names, ID counter and folded log) of a catalog
+# without its log, so edits can be checked without loading every group
+_catalog_summaries = {}
+
+
+def _catalog_names(json_file):
+    """Return a stand-in catalog holding only the names and ID counter of json_file
+
+    The result has the layout of a parsed catalog, with groups reduced to their
+    names and the log already replayed, which is all an add or remove needs to
+    check names and hand out IDs. The JSON part is kept in memory per process
+    until the JSON changes, so with a current summary only the log is parsed.
+    """
+    with _catalog_lock(json_file, exclusive=False):
+        stamp = _file_stamp(json_file)
+        if stamp is None:
+            raise FileNotFoundError(f"No such catalog: '{json_file}'")
+        key = os.path.abspath(json_file)
+        summary = _catalog_summaries.get(key)
+        if summary is None or summary[0] != stamp:
+            data, _ = _cached_catalog_json(json_file, stamp)
+            _seed_group_ids(data)
+            summary = _catalog_summaries[key] = (
+                stamp, [group.get('name') for group in data['functional_groups']],
+                {'next_id': data['metadata']['next_id'],
+                 'folded_log': data['metadata'].get('folded_log')})
+        log_bytes = _read_catalog_log(json_file)
+
+    _, names, metadata = summary
+    data = {'metadata': dict(metadata),
+            'functional_groups': [{'name': name} for name in names]}
+    return _replay_catalog_log(data, log_bytes)
+
+
+def _write_catalog(data, json_file, pretty=False):
+    """Write a functional group catalog as JSON, serializing with orjson when available
+
+    functional_groups is stored as a columnar table (see _groups_to_columns), which
+    spells out each key once rather than once per group. The output is compact
+    unless pretty is set, which indents it by two spaces for reading by hand.
+
+    The catalog is serialized in memory, written with a single write to a temporary
+    file and fsynced before it replaces json_file, so an interrupted write never
+    leaves a truncated catalog behind.
+    """
+    # Metadata first, so _stream_catalog_groups meets it before the groups
+    data = {'metadata': data['metadata'], **data,
+            'functional_groups': _groups_to_columns(data['functional_groups'])}
+    if orjson is not None:
+        json_bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    elif pretty:
+        json_bytes = json.dumps(data, indent=2).encode('utf-8')
+    else:
+        json_bytes = json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    temp_path = f"{json_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(json_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, json_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _forget_shared_analyzer(json_file)
+
+
+def _is_valid_new_group(new_group):
+    """Check that new_group is a dict with the required name and smarts fields"""
+    if not isinstance(new_group, dict):
+        print("Error: a functional group must be given as a dict")
+        return False
+    if 'name' not in new_group or 'smarts' not in new_group:
+        print("Error: 'name' and 'smarts' are required fields")
+        return False
+    return True
+
+
+def _seed_group_ids(data):
+    """Start the fg_### counter in the catalog metadata if it is missing
+
+    Catalogs written before the counter existed get it from one scan of the
+    existing IDs; after that, IDs are handed out without looking at the groups.
+    """
+    metadata = data['metadata']
+    if metadata.get('next_id') is None:
+        max_id = 0
+        for group in data['functional_groups']:
+            id_str = group.get('id', '')
+            if id_str.startswith('fg_'):
+                try:
+                    max_id = max(max_id, int(id_str.split('_')[1]))
+                except (ValueError, IndexError):
+                    continue
+        metadata['next_id'] = max_id + 1
+
+
+def _next_group_id(data):
+    """Return the next fg_### ID from the counter kept in the catalog metadata"""
+    _seed_group_ids(data)
+    metadata = data['metadata']
+    new_id_num = metadata['next_id']
+    metadata['next_id'] = new_id_num + 1
+    return f"fg_{new_id_num:03d}"
+
+
+def _complete_group(new_group):
+    """Return new_group with defaults filled in for the optional fields"""
+    complete_group = {
+        'name': new_group['name'],
+        'smarts': new_group['smarts'],
+        'description': new_group.get('description', ''),
+        'categories': new_group.get('categories', []),
+        'subcategories': new_group.get('subcategories', []),
+        'examples': new_group.get('examples', []),
+        'chebi_id': new_group.get('chebi_id', 'Not available'),
+        'reactivity': new_group.get('reactivity', 'unknown'),
+        'common_reactions': new_group.get('common_reactions', [])
+    }
+
+    # Add other optional fields if present
+    for key in ['simplified', 'alternative', 'chebi_description']:
+        if key in new_group:
+            complete_group[key] = new_group[key]
+    return complete_group
+
+
+class CatalogEditor:
+    """Edit a functional group catalog in memory and write it back once
+
+    Use as a context manager; the file is parsed on entry and rewritten on a clean
+    exit if anything changed, so a batch of edits costs one load and one write:
+
+        with CatalogEditor(json_file) as editor:
+            editor.add({'name': ..., 'smarts': ...})
+            editor.remove('old group')
+
+    Records in the catalog's append log are applied on entry, and the rewrite folds
+    them into the JSON and deletes the log. If the block raises, the files are left
+    untouched. Removed groups are only marked inside the block and dropped from
+    data['functional_groups'] on exit. The file is written as compact JSON unless
+    pretty is set. The catalog lock is held from entry to exit.
+    """
+
+    def __init__(self, json_file, pretty=False):
+        self.json_file = json_file
+        self.pretty = pretty
+        self.data = None
+        self.changed = False
+        self._log_pending = False
+        self._log_bytes = b''
+        self._lock = None
+        self._name_idx = {}
+        self._tombstones = set()
+
+    def __enter__(self):
+        # Held until __exit__, so the whole read-modify-write excludes other writers
+        self._lock = _catalog_lock(self.json_file)
+        self._lock.__enter__()
+        try:
+            self.data = _read_catalog(self.json_file)
+            self._log_bytes = _read_catalog_log(self.json_file)
+        except BaseException:
+            self._release_lock()
+            raise
+        self.changed = False
+        self._log_pending = os.path.exists(_catalog_log_path(self.json_file))
+        # Name -> indices into functional_groups, so removals need no list scan
+        self._name_idx = {}
+        for i, group in enumerate(self.data['functional_groups']):
+            self._name_idx.setdefault(group.get('name'), []).append(i)
+        self._tombstones = set()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._write_back(exc_type)
+        finally:
+            self._release_lock()
+        return False
+
+    def _release_lock(self):
+        """Release the catalog lock taken in __enter__, if it is still held"""
+        if self._lock is not None:
+            lock, self._lock = self._lock, None
+            lock.__exit__(None, None, None)
+
+    def _write_back(self, exc_type):
+        """Write the edited catalog back and fold in the log, unless the block raised"""
+        if exc_type is None and (self.changed or self._log_pending):
+            if self._tombstones:
+                # Drop all removed groups in a single pass
+                self.data['functional_groups'] = [
+                    group for i, group in enumerate(self.data['functional_groups'])
+                    if i not in self._tombstones
+                ]
+                self._tombstones = set()
+            metadata = self.data['metadata']
+            metadata['total_groups'] = len(self.data['functional_groups'])
+            metadata.pop('folded_log', None)
+            if self._log_pending:
+                # Mark the log as folded in, so that if a crash leaves it behind
+                # after the write, loads skip it instead of applying it twice
+                log_id = _catalog_log_id(self._log_bytes)
+                if log_id is not None:
+                    metadata['folded_log'] = {'id': log_id, 'size': len(self._log_bytes)}
+            _write_catalog(self.data, self.json_file, pretty=self.pretty)
+            if self._log_pending:
+                # The log is now part of the JSON, so it can go
+                os.remove(_catalog_log_path(self.json_file))
+                self._log_pending = False
+
+    def _generate_id(self):
+        """Return the next fg_### ID for a group added in this editor"""
+        return _next_group_id(self.data)
+
+    def add(self, new_group):
+        """Add a functional group to the in-memory catalog
+
+        Returns:
+            str: the new group's ID, or None if required fields are missing or a
+                 group of that name already exists
+        """
+        # Ensure required fields
+        if not _is_valid_new_group(new_group):
+            return None
+
+        # Refuse duplicates; a no-op add must not mark the catalog as changed
+        if self._name_idx.get(new_group['name']):
+            print(f"Functional group '{new_group['name']}' already exists")
+            return None
+
+        new_id = self._generate_id()
+        complete_group = {'id': new_id, **_complete_group(new_group)}
+
+        self.data['functional_groups'].append(complete_group)
+        self._name_idx.setdefault(complete_group['name'], []).append(
+            len(self.data['functional_groups']) - 1)
+        self.changed = True
+        return new_id
+
+    def remove(self, group_name):
+        """Remove a functional group from the in-memory catalog
+
+        Returns:
+            bool: True if the group was found and removed
+        """
+        indices = self._name_idx.pop(group_name, None)
+        if not indices:
+            print(f"Functional group '{group_name}' not found")
+            return False
+
+        self._tombstones.update(indices)
+        self.changed = True
+        return True
+
+
+def compact_catalog(json_file, pretty=False):
+    """Fold the append log of a catalog into its JSON file and delete the log
+
+    Args:
+        json_file (str): Path to the JSON file
+        pretty (bool): Indent the rewritten JSON for reading by hand
+    """
+    with CatalogEditor(json_file, pretty=pretty):
+        pass
+
+
 def add_functional_group(new_group, json_file="functional_group_enhanced.json"):
     """Add a new functional group to the database
 
+    The catalog is read to reject a name that is already taken, then the group is
+    appended to the catalog's JSON Lines log rather than rewriting the JSON file.
+    Its fg_### ID is assigned when the log is replayed; the ID it will get is
+    reported on success.
+
     Args:
         new_group (dict): Dictionary containing the new functional group data
                          Required fields: name, smarts, description
@@ -874,69 +2186,69 @@ def add_functional_group(new_group, json_file="functional_group_enhanced.json"):
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        # Load existing data
-        with open(json_file, 'r') as f:
-            data = json.load(f)
+    return add_functional_groups([new_group], json_file) == 1
 
-        # Generate new ID
-        existing_ids = [group.get('id', '')
-                        for group in data['functional_groups']]
-        max_id = 0
-        for id_str in existing_ids:
-            if id_str.startswith('fg_'):
-                try:
-                    num = int(id_str.split('_')[1])
-                    max_id = max(max_id, num)
-                except:
-                    continue
 
-        new_id = f"fg_{max_id + 1:03d}"
+def add_functional_groups(new_groups, json_file="functional_group_enhanced.json"):
+    """Add several functional groups with a single read and one append to the log
 
-        # Ensure required fields
-        if 'name' not in new_group or 'smarts' not in new_group:
-            print("Error: 'name' and 'smarts' are required fields")
-            return False
+    Groups whose name is already in the catalog, or earlier in new_groups, are
+    skipped; if none are left, nothing is written. Names are checked with
+    _catalog_names, so an add does not parse the whole JSON.
 
-        # Set default values for optional fields
-        complete_group = {
-            'id': new_id,
-            'name': new_group['name'],
-            'smarts': new_group['smarts'],
-            'description': new_group.get('description', ''),
-            'categories': new_group.get('categories', []),
-            'subcategories': new_group.get('subcategories', []),
-            'examples': new_group.get('examples', []),
-            'chebi_id': new_group.get('chebi_id', 'Not available'),
-            'reactivity': new_group.get('reactivity', 'unknown'),
-            'common_reactions': new_group.get('common_reactions', [])
-        }
-
-        # Add other optional fields if present
-        for key in ['simplified', 'alternative', 'chebi_description']:
-            if key in new_group:
-                complete_group[key] = new_group[key]
-
-        # Add to data
-        data['functional_groups'].append(complete_group)
-        data['metadata']['total_groups'] = len(data['functional_groups'])
-
-        # Save back to file
-        with open(json_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    Args:
+        new_groups (list): Dictionaries in the format accepted by add_functional_group
+        json_file (str): Path to the JSON file
 
-        print(
-            f"Successfully added functional group '{new_group['name']}' with ID {new_id}")
-        return True
+    Returns:
+        int: Number of groups added
+    """
+    # Reject bad input before touching the catalog
+    new_groups = [new_group for new_group in new_groups if _is_valid_new_group(new_group)]
+    if not new_groups:
+        return 0
 
-    except Exception as e:
-        print(f"Error adding functional group: {e}")
-        return False
+    try:
+        # Hold the lock so no other writer adds the same name between check and append
+        with _catalog_lock(json_file):
+            data = _catalog_names(json_file)
+            taken = {group.get('name') for group in data['functional_groups']}
+
+            added = []
+            for new_group in new_groups:
+                if new_group['name'] in taken:
+                    print(f"Functional group '{new_group['name']}' already exists")
+                    continue
+                taken.add(new_group['name'])
+                added.append(new_group)
+
+            # Replay hands out IDs from the same counter, in log order
+            new_ids = [_next_group_id(data) for _ in added]
+            if added:
+                _append_catalog_log(json_file, [_complete_group(new_group) for new_group in added])
+
+        for new_group, new_id in zip(added, new_ids):
+            print(f"Successfully added functional group '{new_group['name']}' with ID {new_id}")
+        return len(added)
+
+    except FileNotFoundError:
+        print(f"Error adding functional groups: catalog '{json_file}' not found")
+        return 0
+    except json.JSONDecodeError as e:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        print(f"Error adding functional groups: catalog '{json_file}' is not valid JSON: {e}")
+        return 0
+    except OSError as e:
+        print(f"Error adding functional groups: {e}")
+        return 0
 
 
 def remove_functional_group(group_name, json_file="functional_group_with_chebi_updated.json"):
     """Remove a functional group from the database
 
+    The catalog is read to check that the group exists, then a tombstone is
+    appended to its JSON Lines log rather than rewriting the JSON file.
+
     Args:
         group_name (str): Name of the functional group to remove
         json_file (str): Path to the JSON file
@@ -944,32 +2256,47 @@ def remove_functional_group(group_name, json_file="functional_group_with_chebi_u
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        # Load existing data
-        with open(json_file, 'r') as f:
-            data = json.load(f)
-
-        # Find and remove the group
-        original_count = len(data['functional_groups'])
-        data['functional_groups'] = [
-            group for group in data['functional_groups']
-            if group.get('name') != group_name
-        ]
+    return remove_functional_groups([group_name], json_file) == 1
 
-        if len(data['functional_groups']) == original_count:
-            print(f"Functional group '{group_name}' not found")
-            return False
-
-        # Update metadata
-        data['metadata']['total_groups'] = len(data['functional_groups'])
 
-        # Save back to file
-        with open(json_file, 'w') as f:
-            json.dump(data, f, indent=2)
+def remove_functional_groups(group_names, json_file="functional_group_with_chebi_updated.json"):
+    """Remove several functional groups with a single read and one append to the log
 
-        print(f"Successfully removed functional group '{group_name}'")
-        return True
+    Args:
+        group_names (list): Names of the functional groups to remove
+        json_file (str): Path to the JSON file
 
-    except Exception as e:
-        print(f"Error removing functional group: {e}")
-        return False
+    Returns:
+        int: Number of groups removed
+    """
+    try:
+        # Hold the lock so no other writer changes the catalog between check and append
+        with _catalog_lock(json_file):
+            data = _catalog_names(json_file)
+            present = {group.get('name') for group in data['functional_groups']}
+
+            removed = []
+            for group_name in group_names:
+                if group_name not in present:
+                    print(f"Functional group '{group_name}' not found")
+                    continue
+                present.discard(group_name)
+                removed.append(group_name)
+
+            if removed:
+                _append_catalog_log(json_file, [{'_tombstone': group_name} for group_name in removed])
+
+        for group_name in removed:
+            print(f"Successfully removed functional group '{group_name}'")
+        return len(removed)
+
+    except FileNotFoundError:
+        print(f"Error removing functional groups: catalog '{json_file}' not found")
+        return 0
+    except json.JSONDecodeError as e:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        print(f"Error removing functional groups: catalog '{json_file}' is not valid JSON: {e}")
+        return 0
+    except OSError as e:
+        print(f"Error removing functional groups: {e}")
+        return 0
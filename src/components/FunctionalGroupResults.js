@@ -1,5 +1,6 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import styled from 'styled-components';
+import { analysisImageUrl, fetchGroupImage } from '../services/api';
 
 const ResultsContainer = styled.div`
   background: white;
@@ -160,18 +161,34 @@ const ChEBILink = styled.a`
   }
 `;
 
-function FunctionalGroupCard({ group, individualImage }) {
+function FunctionalGroupCard({ group, individualImage, jobId }) {
   const [showDetails, setShowDetails] = useState(false);
+  const [lazyImage, setLazyImage] = useState(null);
+
+  // Thumbnails not included in the analysis response are rendered on demand
+  useEffect(() => {
+    if (individualImage || !jobId) {
+      return undefined;
+    }
+    let cancelled = false;
+    setLazyImage(null);
+    fetchGroupImage(jobId, group.name)
+      .then((image) => { if (!cancelled) setLazyImage(image); })
+      .catch((error) => console.error('Error loading group image:', error));
+    return () => { cancelled = true; };
+  }, [individualImage, jobId, group.name]);
+
+  const groupImage = individualImage || lazyImage;
 
   return (
     <GroupCard>
       <GroupName>{group.name}</GroupName>
 
-      {individualImage && (
+      {groupImage && (
         <GroupImage>
           <GroupImageTitle>Structure in Molecule</GroupImageTitle>
           <GroupImageImg 
-            src={`data:image/png;base64,${individualImage}`}
+            src={groupImage}
             alt={`${group.name} highlighted in molecule`}
           />
         </GroupImage>
@@ -275,6 +292,10 @@ function FunctionalGroupCard({ group, individualImage }) {
 }
 
 function FunctionalGroupResults({ result }) {
+  const jobId = result && result.job_id;
+  // Overview URL that failed to load, so a broken image is hidden rather than shown
+  const [failedImageSrc, setFailedImageSrc] = useState(null);
+
   if (!result || !result.matches) {
     return (
       <ResultsContainer>
@@ -283,7 +304,13 @@ function FunctionalGroupResults({ result }) {
     );
   }
 
-  const { matches, groups_data, image, individual_images } = result;
+  const { matches, groups_data, individual_images } = result;
+  // The overview image is either inline (base64) or rendered in the background and
+  // loaded by the browser straight from the PNG endpoint; image_url is null when
+  // there is no overview to load
+  const imageSrc = result.image
+    ? `data:image/png;base64,${result.image}`
+    : result.image_url && jobId && analysisImageUrl(jobId);
 
   return (
     <ResultsContainer>
@@ -295,12 +322,13 @@ function FunctionalGroupResults({ result }) {
         </SummaryText>
       </Summary>
 
-      {image && (
+      {imageSrc && imageSrc !== failedImageSrc && (
         <MoleculeVisualization>
           <h3 style={{marginTop: 0, color: '#333'}}>Molecular Structure with Highlighted Functional Groups</h3>
           <MoleculeImage 
-            src={`data:image/png;base64,${image}`} 
+            src={imageSrc} 
             alt="Molecule with highlighted functional groups"
+            onError={() => setFailedImageSrc(imageSrc)}
           />
           <p style={{marginBottom: 0, fontSize: '0.9rem', color: '#666'}}>
             Different colors represent different functional groups
@@ -315,6 +343,7 @@ function FunctionalGroupResults({ result }) {
               key={index}
               group={groups_data[groupName] || { name: groupName }}
               individualImage={individual_images && individual_images[groupName]}
+              jobId={jobId}
             />
           ))}
         </GroupsGrid>
@@ -28,6 +28,22 @@ export const analyzeMolecule = async (moleculeData) => {
   }
 };
 
+// The overview image is served as raw PNG, so it can be used directly as an <img> src
+export const analysisImageUrl = (jobId) => `${API_BASE_URL}/analyze/${jobId}/main.png`;
+
+export const fetchGroupImage = async (jobId, groupName) => {
+  const response = await fetch(
+    `${API_BASE_URL}/analyze/${jobId}/image/${encodeURIComponent(groupName)}`
+  );
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch functional group image');
+  }
+
+  const result = await response.json();
+  return result.image;
+};
+
 export const searchFunctionalGroups = async (searchTerm) => {
   try {
     const response = await fetch(`${API_BASE_URL}/search/${encodeURIComponent(searchTerm)}`);
@@ -0,0 +1,104 @@
+"""Tests for the matcher and its cached variant, run against the bundled catalog
+
+Run from the src directory with: python -m unittest test_matching
+"""
+import contextlib
+import io
+import os
+import random
+import unittest
+
+from rdkit import Chem
+
+import FunctionalCatalog as fc
+
+
+CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                       'functional_group_with_chebi_updated.json')
+
+# Ring systems with substituents, where the ring overlap filter depends on atom order
+MOLECULES = ['c1ccc2ccccc2c1O', 'C1CCC2(CC1)OCCO2', 'O=C1NC(=O)c2ccccc21',
+             'c1ccc(cc1)C(=O)Oc1ccncc1', 'OC1C(O)C(O)C(CO)OC1O', 'CC(=O)Oc1ccccc1C(=O)O']
+
+# Neutral, charged, explicit-H and multi-fragment targets across the catalog's elements
+TARGETS = MOLECULES + ['CCO', '[H]OC([H])([H])C', 'OCC(N)C(=O)O', 'c1ccncc1CCBr', 'CC=O',
+                       'CC(=O)[O-]', 'C[N+](C)(C)C', 'O=[N+]([O-])c1ccccc1', 'CS(=O)(=O)N',
+                       'OP(=O)(O)OC', 'CCS', 'C=CC#N', 'CC=NC', 'OB(O)c1ccccc1', 'C[SiH3]',
+                       '[Na+].[Cl-]', 'FC(F)(F)c1ccc(I)cc1', '[NH4+]', 'O', '[Ar]']
+
+
+def baseline_find_matches(target_mol, compiled_patterns, filter_ring_overlaps=True):
+    """The matcher as first written: every pattern against every hydrogen variant"""
+    target_with_h = fc.safe_add_hs(target_mol)
+    target_no_h = fc.safe_remove_hs(target_mol)
+    matches_with_atoms = []
+    for pattern_name, pattern_mol in compiled_patterns.items():
+        for mol in (target_mol, target_with_h, target_no_h):
+            if mol and mol.HasSubstructMatch(pattern_mol):
+                matches_with_atoms.append((pattern_name, mol.GetSubstructMatch(pattern_mol)))
+                break
+    if filter_ring_overlaps:
+        matches_with_atoms = fc.filter_ring_subfunctional_overlaps(target_mol, matches_with_atoms)
+    return sorted(match[0] for match in matches_with_atoms)
+
+
+class MatchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.analyzer = fc.FunctionalGroupAnalyzer(CATALOG).load()
+
+    def test_matches_baseline(self):
+        patterns = self.analyzer.get_compiled_patterns()
+        fingerprints = self.analyzer.get_pattern_fingerprints()
+        for smiles in TARGETS:
+            mol = Chem.MolFromSmiles(smiles)
+            for filter_ring_overlaps in (False, True):
+                with self.subTest(smiles=smiles, filter_ring_overlaps=filter_ring_overlaps), \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(
+                        sorted(fc.find_matches(mol, patterns, filter_ring_overlaps,
+                                               pattern_fingerprints=fingerprints)),
+                        baseline_find_matches(mol, patterns, filter_ring_overlaps))
+
+    def test_worker_processes_match_serial_search(self):
+        patterns = self.analyzer.get_compiled_patterns()
+        for smiles in MOLECULES[:2]:
+            mol = Chem.MolFromSmiles(smiles)
+            with self.subTest(smiles=smiles), contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(fc.find_matches(mol, patterns, n_jobs=2),
+                                 fc.find_matches(mol, patterns))
+
+    def test_cached_matches_follow_the_callers_atom_order(self):
+        patterns = self.analyzer.get_compiled_patterns()
+        fingerprints = self.analyzer.get_pattern_fingerprints()
+        rng = random.Random(0)
+        for smiles in MOLECULES:
+            mol = Chem.MolFromSmiles(smiles)
+            for _ in range(4):
+                order = list(range(mol.GetNumAtoms()))
+                rng.shuffle(order)
+                renumbered = Chem.RenumberAtoms(mol, order)
+                with self.subTest(smiles=smiles, order=order), \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(
+                        fc.find_matches_cached(renumbered, self.analyzer),
+                        fc.find_matches(renumbered, patterns, pattern_fingerprints=fingerprints))
+
+    def test_matches_follow_edits_to_the_molecule(self):
+        patterns = self.analyzer.get_compiled_patterns()
+        mol = Chem.RWMol(Chem.MolFromSmiles('CCO'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIn('ethanol', fc.find_matches(mol, patterns))
+
+            # Turn the hydroxyl into an amine in place
+            mol.GetAtomWithIdx(2).SetAtomicNum(7)
+            Chem.SanitizeMol(mol)
+            matches = fc.find_matches(mol, patterns)
+        self.assertNotIn('ethanol', matches)
+        self.assertEqual(matches, fc.find_matches(Chem.MolFromSmiles('CCN'), patterns))
+
+
+if __name__ == '__main__':
+    unittest.main()